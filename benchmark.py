@@ -0,0 +1,337 @@
+"""Benchmark for the monitor, using synthetic processes and a local stand-in for GitHub.
+
+Spawns N child processes (sleeping, CPU-hot, killed and zombied), generates a matching source map,
+and drives a full check (``run.check``) against a local HTTP stub of the GitHub API,
+that is backed by a local bare git repository.
+
+>>> python benchmark.py --sizes 10 100 1000 --ticks 5
+"""
+
+import argparse
+import asyncio
+import atexit
+import base64
+import json
+import logging
+import math
+import os
+import re
+import shutil
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from typing import Dict, List, Tuple
+
+import yaml
+
+WORKSPACE = tempfile.mkdtemp(prefix="jarvis_benchmark_")
+# Registered first, so it runs after the log listener is stopped at exit
+atexit.register(shutil.rmtree, WORKSPACE, ignore_errors=True)
+SOURCE_MAP = os.path.join(WORKSPACE, "processes.yaml")
+
+# Environment variables have to be set before the constants are loaded
+os.environ.update(
+    source_map=SOURCE_MAP,
+    git_user=os.environ.get("git_user", "benchmark"),
+    git_token=os.environ.get("git_token", "benchmark"),
+    git_owner=os.environ.get("git_owner", "benchmark"),
+    log="stdout",
+)
+
+import git  # noqa: E402
+import psutil  # noqa: E402
+from gitdb import IStream  # noqa: E402
+
+from models.constants import LOGGER, env, static  # noqa: E402
+
+# Before importing the monitored modules, since they open the state files at import
+static.isolate(WORKSPACE)
+
+import run  # noqa: E402
+
+EMPTY_TREE = "4b825dc642cb6eb9a060e54bf8d69288fbee4904"
+GIT_ENV = {
+    "GIT_AUTHOR_NAME": "benchmark",
+    "GIT_AUTHOR_EMAIL": "benchmark@localhost",
+    "GIT_COMMITTER_NAME": "benchmark",
+    "GIT_COMMITTER_EMAIL": "benchmark@localhost",
+}
+
+
+class GitHubStub(BaseHTTPRequestHandler):
+    """Local stand-in for the subset of GitHub API used by the monitor, backed by a bare git repository.
+
+    >>> GitHubStub
+
+    """
+
+    repository: git.Repo = None
+    lock = threading.Lock()
+    requests: List[str] = []
+
+    def log_message(self, format: str, *args) -> None:
+        """Suppresses the access logs."""
+
+    def respond(self, status: int, body: dict = None, headers: dict = None) -> None:
+        """Sends a JSON response."""
+        data = json.dumps(body).encode() if body is not None else b""
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def payload(self) -> dict:
+        """Reads the JSON payload from the request."""
+        return json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+
+    def head(self) -> str | None:
+        """Gets the commit SHA of docs branch."""
+        try:
+            return self.repository.git.rev_parse(f"refs/heads/{static.DOCS_BRANCH}")
+        except git.GitCommandError:
+            return
+
+    def do_GET(self) -> None:
+        """Serves the branch reference, commits and contents."""
+        self.requests.append(f"GET {self.path}")
+        with self.lock:
+            if self.path.endswith(f"/git/ref/heads/{static.DOCS_BRANCH}"):
+                if not (sha := self.head()):
+                    return self.respond(404, {"message": "Not Found"})
+                etag = f'"{sha}"'
+                if self.headers.get("If-None-Match") == etag:
+                    return self.respond(304)
+                return self.respond(200, {"object": {"sha": sha}}, {"ETag": etag})
+            if match := re.search(r"/git/commits/(\w+)$", self.path):
+                commit = self.repository.commit(match.group(1))
+                return self.respond(
+                    200, {"sha": commit.hexsha, "tree": {"sha": commit.tree.hexsha}}
+                )
+            if "/contents/" in self.path and (sha := self.head()):
+                blob = self.repository.commit(sha).tree / static.INDEX_PATH
+                content = blob.data_stream.read()
+                return self.respond(
+                    200,
+                    {"sha": blob.hexsha, "content": base64.b64encode(content).decode()},
+                )
+        self.respond(404, {"message": "Not Found"})
+
+    def do_POST(self) -> None:
+        """Creates trees and commits."""
+        self.requests.append(f"POST {self.path}")
+        payload = self.payload()
+        with self.lock:
+            if self.path.endswith("/git/trees"):
+                index_file = os.path.join(WORKSPACE, "index")
+                index_env = {"GIT_INDEX_FILE": index_file}
+                try:
+                    self.repository.git.read_tree(payload["base_tree"], env=index_env)
+                except git.GitCommandError:
+                    return self.respond(422, {"message": "Invalid tree info"})
+                for entry in payload["tree"]:
+                    content = entry["content"].encode()
+                    stream = self.repository.odb.store(
+                        IStream("blob", len(content), BytesIO(content))
+                    )
+                    self.repository.git.update_index(
+                        "--add",
+                        "--cacheinfo",
+                        f"{entry['mode']},{stream.hexsha.decode()},{entry['path']}",
+                        env=index_env,
+                    )
+                tree = self.repository.git.write_tree(env=index_env)
+                return self.respond(201, {"sha": tree})
+            if self.path.endswith("/git/commits"):
+                parents = [arg for sha in payload["parents"] for arg in ("-p", sha)]
+                commit = self.repository.git.commit_tree(
+                    payload["tree"], *parents, "-m", payload["message"], env=GIT_ENV
+                )
+                return self.respond(201, {"sha": commit})
+        self.respond(404, {"message": "Not Found"})
+
+    def do_PATCH(self) -> None:
+        """Updates the branch reference, only if it exists and the update is a fast-forward."""
+        self.requests.append(f"PATCH {self.path}")
+        sha = self.payload()["sha"]
+        with self.lock:
+            # GitHub doesn't create a missing reference on update, which is how the deleted docs branch is detected
+            if not (head := self.head()):
+                return self.respond(422, {"message": "Reference does not exist"})
+            if not self.repository.is_ancestor(head, sha):
+                return self.respond(422, {"message": "Update is not a fast forward"})
+            self.repository.git.update_ref(f"refs/heads/{static.DOCS_BRANCH}", sha)
+        self.respond(200, {"object": {"sha": sha}})
+
+
+def start_stub() -> str:
+    """Initiates a bare repository with the docs branch, and starts the stub in a daemon thread.
+
+    Returns:
+        str:
+        Returns the base URL of the stub.
+    """
+    repository = git.Repo.init(os.path.join(WORKSPACE, "remote.git"), bare=True)
+    root = repository.git.commit_tree(EMPTY_TREE, "-m", "Initial commit", env=GIT_ENV)
+    repository.git.update_ref(f"refs/heads/{static.DOCS_BRANCH}", root)
+    GitHubStub.repository = repository
+    server = ThreadingHTTPServer(("127.0.0.1", 0), GitHubStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def redirect(base_url: str) -> None:
+    """Points the GitHub endpoints to the stub."""
+    static.INDEX_URL = f"{base_url}/contents/{static.INDEX_PATH}"
+    static.REF_URL = f"{base_url}/git/ref/heads/{static.DOCS_BRANCH}"
+    static.REFS_URL = f"{base_url}/git/refs/heads/{static.DOCS_BRANCH}"
+    static.TREES_URL = f"{base_url}/git/trees"
+    static.COMMITS_URL = f"{base_url}/git/commits"
+
+
+def spawn(size: int) -> Tuple[Dict[str, Dict[int, List[str]]], List[int]]:
+    """Spawns synthetic processes and generates the source map for them.
+
+    Args:
+        size: Number of processes.
+
+    Returns:
+        Tuple[Dict[str, Dict[int, List[str]]], List[int]]:
+        Returns the source map and the PIDs to be killed at the end.
+    """
+    pids, children = [], []
+    hot = max(1, size // 100)
+    killed = zombied = max(1, size // 20)
+    for _ in range(hot):
+        child = subprocess.Popen([sys.executable, "-c", "while True: pass"])
+        pids.append(child.pid)
+        children.append(child.pid)
+    for _ in range(killed):
+        child = subprocess.Popen(["sleep", "3600"])
+        child.kill()
+        child.wait()
+        pids.append(child.pid)
+    for _ in range(zombied):
+        # Forked child exits right away, and is never reaped until the end of the benchmark
+        if (pid := os.fork()) == 0:
+            os._exit(0)
+        pids.append(pid)
+        children.append(pid)
+    for _ in range(size - len(pids)):
+        child = subprocess.Popen(["sleep", "3600"])
+        pids.append(child.pid)
+        children.append(child.pid)
+    source_map = {}
+    for index, pid in enumerate(pids):
+        # Main process is expected to be named jarvis, as in the map generated by Jarvis
+        name = f"component_{index // 10}" if index // 10 else "jarvis"
+        source_map.setdefault(name, {})[pid] = [f"Impact of {name}"]
+    with open(SOURCE_MAP, "w") as file:
+        yaml.dump(source_map, file)
+    return source_map, children
+
+
+def terminate(children: List[int]) -> None:
+    """Kills and reaps all the synthetic processes."""
+    for pid in children:
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    for pid in children:
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+
+
+def measure(github: run.GitHub, ticks: int) -> List[Dict[str, float]]:
+    """Runs the check and push for a number of ticks, and measures each one.
+
+    Args:
+        github: GitHub object.
+        ticks: Number of ticks.
+
+    Returns:
+        List[Dict[str, float]]:
+        Returns latency, CPU time, RSS and number of requests for each tick.
+    """
+    process = psutil.Process()
+    results = []
+    for _ in range(ticks):
+        GitHubStub.requests.clear()
+        cpu_times = process.cpu_times()
+        start = time.perf_counter()
+        asyncio.run(run.check(github))
+        latency = time.perf_counter() - start
+        cpu = sum(process.cpu_times()[:2]) - sum(cpu_times[:2])
+        results.append(
+            {
+                "latency": latency * 1_000,
+                "cpu": cpu * 1_000,
+                "rss": process.memory_info().rss / 1_048_576,
+                "requests": len(GitHubStub.requests),
+            }
+        )
+    return results
+
+
+def report(size: int, results: List[Dict[str, float]]) -> None:
+    """Prints the measurements for each tick, and the median of the warm ticks."""
+    print(f"\n{size} PIDs")
+    print(
+        f"{'tick':>6} {'latency ms':>12} {'cpu ms':>10} {'rss MB':>10} {'requests':>9}"
+    )
+    for tick, result in enumerate(results, start=1):
+        print(
+            f"{tick:>6} {result['latency']:>12.2f} {result['cpu']:>10.2f} "
+            f"{result['rss']:>10.2f} {result['requests']:>9}"
+        )
+    if warm := results[1:]:
+        print(
+            f"{'median':>6} {statistics.median(r['latency'] for r in warm):>12.2f} "
+            f"{statistics.median(r['cpu'] for r in warm):>10.2f} "
+            f"{statistics.median(r['rss'] for r in warm):>10.2f} "
+            f"{statistics.median(r['requests'] for r in warm):>9}"
+        )
+
+
+def main() -> None:
+    """Runs the benchmark for each size."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--ticks", type=int, default=5)
+    parser.add_argument(
+        "--performance", action="store_true", help="Enable check_performance."
+    )
+    parser.add_argument("--verbose", action="store_true", help="Show the monitor logs.")
+    args = parser.parse_args()
+    if not args.verbose:
+        LOGGER.setLevel(logging.CRITICAL + 1)
+    env.check_performance = args.performance
+    # Notifications are out of scope for the benchmark
+    env.gmail_user = env.gmail_pass = env.recipient = None
+    env.override_check = []
+    # Governor is pinned to the full tier, since the hot children push the host load over the limit
+    env.load_limit = env.overhead_budget = env.memory_budget = math.inf
+    redirect(start_stub())
+    github = run.GitHub()
+    print(f"Workspace: {WORKSPACE}")
+    for size in args.sizes:
+        _, children = spawn(size)
+        try:
+            report(size, measure(github, args.ticks))
+        finally:
+            terminate(children)
+
+
+if __name__ == "__main__":
+    main()
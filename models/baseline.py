@@ -0,0 +1,67 @@
+import math
+from typing import Dict, List
+
+from models import storage
+from models.constants import LOGGER, env, static
+
+# Weight of the latest sample, which makes the baseline follow roughly the last 40 samples
+ALPHA = 0.05
+# Smallest deviation that is flagged for each metric, so that a flat baseline doesn't flag every small change
+FLOORS = {"cpu": 5.0, "threads": 2.0, "fds": 2.0, "open_files": 2.0}
+# Fixed limits that are used until the baseline has warmed up
+LIMITS = {"cpu": 50.0, "open_files": 50.0}
+BASELINES: Dict[str, Dict[str, List[float]]] = {}
+
+
+def load_state() -> Dict[str, Dict[str, List[float]]]:
+    """Loads the baselines for all the processes, only once per process."""
+    if not BASELINES:
+        BASELINES.update(storage.load(static.BASELINE_STATE) or {})
+    return BASELINES
+
+
+def dump_state() -> None:
+    """Dumps the baselines for all the processes."""
+    storage.dump(static.BASELINE_STATE, BASELINES)
+
+
+def observe(name: str, metrics: Dict[str, float | int]) -> Dict[str, float | int]:
+    """Updates the baseline of a process with its metrics, and returns the metrics that are anomalous.
+
+    Args:
+        name: Name of the baseline, which identifies the process across restarts.
+        metrics: Metric name and the value as key-value pair.
+
+    Returns:
+        Dict[str, float | int]:
+        Returns the metrics that deviate from the baseline, or breach the fixed limits during the warm-up.
+
+    Notes:
+        - Each metric is kept as the number of samples, an exponentially weighted mean and variance,
+          so the memory used is constant regardless of how long the monitor has been running.
+        - A metric is anomalous when it is above the mean by more than the deviation times the standard deviation.
+        - Baseline is updated with the anomalous values as well, so that a permanent change is eventually accepted.
+    """
+    baseline = load_state().setdefault(name, {})
+    anomalies = {}
+    for key, value in metrics.items():
+        count, mean, variance = baseline.get(key, (0, float(value), 0.0))
+        if count >= env.baseline_warmup:
+            spread = max(env.baseline_deviation * math.sqrt(variance), FLOORS[key])
+            if value > mean + spread:
+                LOGGER.debug(
+                    "%s: %s is %s against a baseline of %.2f ± %.2f",
+                    name,
+                    key,
+                    value,
+                    mean,
+                    spread,
+                )
+                anomalies[key] = value
+        elif key in LIMITS and value > LIMITS[key]:
+            anomalies[key] = value
+        delta = value - mean
+        mean += ALPHA * delta
+        variance = (1 - ALPHA) * (variance + ALPHA * delta * delta)
+        baseline[key] = [count + 1, mean, variance]
+    return anomalies
@@ -0,0 +1,79 @@
+import time
+from typing import Dict
+
+import requests
+
+from models import storage
+from models.constants import LOGGER, env, static
+
+# Seconds the circuit stays open after reaching the threshold, doubling with each failure up to an hour
+BACKOFF = 60
+MAX_BACKOFF = 3_600
+
+
+def load_state() -> Dict[str, float | int]:
+    """Loads the state of the circuit, which is shared between the runs."""
+    return storage.load(static.BREAKER_STATE) or {"failures": 0, "opened_until": 0}
+
+
+def dump_state(state: Dict[str, float | int]) -> None:
+    """Dumps the state of the circuit."""
+    storage.dump(static.BREAKER_STATE, state)
+
+
+def allow() -> bool:
+    """Checks if requests to GitHub are allowed, which is when the circuit is closed or the open period has expired.
+
+    Returns:
+        bool:
+        Returns a boolean flag to indicate if the request can be made.
+    """
+    state = load_state()
+    if (remaining := state["opened_until"] - time.time()) > 0:
+        LOGGER.info("Circuit is open, skipping requests to GitHub for %ds", remaining)
+        return False
+    return True
+
+
+def is_outage(response: requests.Response) -> bool:
+    """Checks if a response is from an outage of GitHub, or from an exceeded rate limit.
+
+    Args:
+        response: Response object from GitHub.
+
+    Returns:
+        bool:
+        Returns a boolean flag to indicate that the request has to be counted as a failure.
+
+    Notes:
+        GitHub responds with a 403 instead of a 429 for the primary rate limit, and for some of the secondary ones.
+    """
+    if response.status_code >= 500 or response.status_code == 429:
+        return True
+    return response.status_code == 403 and (
+        response.headers.get("X-RateLimit-Remaining") == "0"
+        or "Retry-After" in response.headers
+    )
+
+
+def failure(error: str) -> None:
+    """Records a failed request, and opens the circuit once the failures reach the threshold.
+
+    Args:
+        error: Reason for the failure.
+    """
+    state = load_state()
+    state["failures"] += 1
+    LOGGER.error("Request to GitHub failed [%d]: %s", state["failures"], error)
+    if (excess := state["failures"] - env.breaker_threshold) >= 0:
+        backoff = min(BACKOFF * 2**excess, MAX_BACKOFF)
+        state["opened_until"] = time.time() + backoff
+        LOGGER.warning("Circuit opened for %ds", backoff)
+    dump_state(state)
+
+
+def success() -> None:
+    """Records a successful request, which closes the circuit."""
+    if load_state()["failures"]:
+        LOGGER.info("Circuit closed, GitHub has recovered")
+        dump_state({"failures": 0, "opened_until": 0})
@@ -0,0 +1,125 @@
+import hmac
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer
+from typing import Dict, List, Tuple
+
+import requests
+
+from models.constants import LOGGER, color_codes, env
+from models.server import QuietHandler, serve
+
+# Latest snapshot from each agent, along with the time it was received
+AGENTS: Dict[str, Tuple[float, Dict[str, list]]] = {}
+LOCK = threading.Lock()
+
+
+def send(results: Dict[str, Tuple[str, List[str], bool]]) -> None:
+    """Sends the classification results of this host to the collector.
+
+    Args:
+        results: Function name and a tuple of color name, impact and notify flag as key-value pair.
+    """
+    headers = (
+        {"Authorization": f"Bearer {env.collector_token}"}
+        if env.collector_token
+        else {}
+    )
+    response = requests.post(
+        str(env.collector_url),
+        json={"host": env.hostname, "timestamp": time.time(), "results": results},
+        headers=headers,
+        timeout=env.publish_timeout,
+    )
+    response.raise_for_status()
+    LOGGER.info("Sent %d result(s) to the collector", len(results))
+
+
+def get_agents() -> Dict[str, Tuple[float, Dict[str, list]]]:
+    """Gets the latest snapshot from each agent."""
+    with LOCK:
+        return dict(AGENTS)
+
+
+def is_valid(payload: dict) -> bool:
+    """Validates the snapshot sent by an agent.
+
+    Args:
+        payload: Snapshot from the agent.
+
+    Returns:
+        bool:
+        Returns a boolean flag to indicate if the snapshot is valid.
+    """
+    if not isinstance(payload, dict) or not isinstance(payload.get("host"), str):
+        return False
+    if not isinstance(results := payload.get("results"), dict):
+        return False
+    for result in results.values():
+        if not (isinstance(result, list) and len(result) == 3):
+            return False
+        color, impact, notify = result
+        if color not in type(color_codes).model_fields:
+            return False
+        if not isinstance(impact, list) or not isinstance(notify, bool):
+            return False
+        # Impact is rendered into the status page and the notification, so it is limited to non-empty text
+        if not impact or not all(isinstance(item, str) for item in impact):
+            return False
+    return True
+
+
+class Handler(QuietHandler):
+    """Request handler that receives the snapshots from the agents.
+
+    >>> Handler
+
+    """
+
+    def do_POST(self) -> None:
+        """Stores the snapshot from an agent, replacing the previous one from the same host."""
+        if self.path.split("?")[0] != "/snapshot":
+            self.send_error(404)
+            return
+        # Compared in constant time, so the token cannot be guessed from the response times
+        if not hmac.compare_digest(
+            self.headers.get("Authorization", "").encode(),
+            f"Bearer {env.collector_token}".encode(),
+        ):
+            self.send_error(401)
+            return
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        except (TypeError, ValueError) as error:
+            LOGGER.debug(error)
+            payload = None
+        if not is_valid(payload):
+            self.send_error(400)
+            return
+        with LOCK:
+            AGENTS[payload["host"]] = (time.time(), payload["results"])
+        LOGGER.debug("Received snapshot from '%s'", payload["host"])
+        self.send_response(204)
+        self.end_headers()
+
+
+def start(port: int) -> ThreadingHTTPServer:
+    """Starts the collector in a daemon thread, to receive the snapshots from the agents.
+
+    Args:
+        port: Port number to listen on.
+
+    Raises:
+        ValueError:
+        Raises an error when the token is not set, since anyone who can reach the port could post results.
+
+    Returns:
+        ThreadingHTTPServer:
+        Returns the server object.
+    """
+    if not env.collector_token:
+        raise ValueError("collector_token is required to start the collector")
+    server = serve(port, Handler)
+    LOGGER.info("Collecting snapshots at http://0.0.0.0:%d/snapshot", port)
+    return server
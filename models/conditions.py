@@ -10,7 +10,8 @@ def all_pids_are_red(status: dict) -> bool:
 
 def main_process_is_red(status: dict) -> bool:
     """Checks condition for main process being red and returns a boolean flag."""
-    return status["Jarvis"][0] == color_codes.red
+    # Main process may be missing, when it runs on an agent that hasn't reported to the collector yet
+    return (main := status.get("Jarvis")) is not None and main[0] == color_codes.red
 
 
 def some_pids_are_red(status: dict) -> bool:
@@ -1,13 +1,26 @@
+import atexit
+import json
 import logging
+import logging.handlers
 import os
 import pathlib
+import queue
+import socket
 import sys
 import time
 from datetime import datetime, timedelta
-from threading import Thread
 from typing import List, Union
 
-from pydantic import BaseModel, DirectoryPath, EmailStr, FilePath, HttpUrl, NewPath
+from pydantic import (
+    BaseModel,
+    DirectoryPath,
+    EmailStr,
+    FilePath,
+    HttpUrl,
+    NewPath,
+    PositiveFloat,
+    PositiveInt,
+)
 from pydantic_settings import BaseSettings
 
 if sys.version_info.minor > 10:
@@ -33,6 +46,17 @@ class LogOptions(StrEnum):
     stdout = "stdout"
 
 
+class LogFormat(StrEnum):
+    """Logging formats.
+
+    >>> LogFormat
+
+    """
+
+    text = "text"
+    json = "json"
+
+
 class EnvConfig(BaseSettings):
     """Settings to load and validate environment variables.
 
@@ -46,6 +70,7 @@ class EnvConfig(BaseSettings):
     git_owner: str
 
     log: LogOptions = LogOptions.file
+    log_format: LogFormat = LogFormat.text
     debug: bool = False
     gmail_user: Union[EmailStr, None] = None
     gmail_pass: Union[str, None] = None
@@ -53,8 +78,37 @@ class EnvConfig(BaseSettings):
     skip_schedule: Union[str, None] = None
     check_performance: bool = False
     check_existing: bool = True
+    baseline_warmup: PositiveInt = 30
+    baseline_deviation: PositiveFloat = 3.0
+    overhead_budget: PositiveFloat = 5.0
+    memory_budget: PositiveInt = 512
+    load_limit: PositiveFloat = 90.0
     override_check: List[int] = [0]
     log_retention: int = 3
+    daemon: bool = False
+    interval: PositiveInt = 60
+    watch: bool = False
+    metrics_port: Union[PositiveInt, None] = None
+    profile: bool = False
+    source_cache: bool = False
+    publish_interval: int = 0
+    history_retention: PositiveInt = 30
+    store_metrics: bool = False
+    metrics_retention: PositiveInt = 30
+    track_uptime: bool = True
+    client_render: bool = False
+    publish_timeout: PositiveInt = 30
+    github_timeout: PositiveInt = 10
+    breaker_threshold: PositiveInt = 3
+    collector_port: Union[PositiveInt, None] = None
+    collector_url: Union[HttpUrl, None] = None
+    collector_token: Union[str, None] = None
+    agent_expiry: PositiveInt = 180
+    hostname: str = socket.gethostname()
+    notify_timeout: PositiveInt = 30
+    notify_digest: int = 0
+    probe_timeout: PositiveFloat = 2.0
+    probe_latency: PositiveFloat = 0.5
 
     class Config:
         """Environment variables configuration."""
@@ -84,37 +138,113 @@ class ColorCode(BaseModel):
     yellow: str = "&#128993;"  # large yellow circle
 
 
-def add_spacing(log_file: str) -> None:
+class JsonFormatter(logging.Formatter):
+    """Formats log records as JSON lines, for the logs to be ingested by a log aggregator.
+
+    >>> JsonFormatter
+
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Formats the log record as a single line of JSON.
+
+        Args:
+            record: Log record.
+
+        Returns:
+            str:
+            Returns the JSON string.
+        """
+        # Traceback is already a part of the message, since it is formatted before the record is queued
+        return json.dumps(
+            {
+                "timestamp": datetime.fromtimestamp(record.created).isoformat(
+                    timespec="milliseconds"
+                ),
+                "level": record.levelname,
+                "module": record.module,
+                "line": record.lineno,
+                "function": record.funcName,
+                "message": record.getMessage(),
+            }
+        )
+
+
+def add_spacing(handler: logging.FileHandler) -> None:
     """Add a unique line in between, to indicate new log timestamp.
 
     Args:
-        log_file: Name of the log file.
+        handler: File handler for the log file.
     """
     write: str = "".join(["*" for _ in range(120)])
-    with open(log_file, "a+") as file:
-        file.seek(0)
-        if not file.read():
-            file.write(f"{write}\n")
-        else:
-            file.write(f"\n{write}\n")
-        file.flush()
+    if os.stat(handler.baseFilename).st_size:
+        write = f"\n{write}"
+    handler.stream.write(f"{write}\n")
+    handler.stream.flush()
 
 
-def cleanup_logs(directory: str, filename: str) -> None:
-    """Deletes previous days' log file as per the log retention period.
+def cleanup_dated_logs(directory: str) -> None:
+    """Deletes the dated log files from before the logs were rotated, as per the log retention period.
 
     Args:
         directory: Directory where logs are stored.
-        filename: Filename format for the log files.
     """
-    retain = [
-        (datetime.now() - timedelta(days=i)).strftime(os.path.join(directory, filename))
-        for i in range(env.log_retention)
-    ]
+    # Same as the rotation, which keeps the log of today and the log retention number of previous days
+    expiry = (datetime.now() - timedelta(days=env.log_retention)).date()
     for file in os.listdir(directory):
-        file = os.path.join(directory, file)
-        if file not in retain:
-            os.remove(file)
+        try:
+            date = datetime.strptime(file, "jarvis_%d-%m-%Y.log").date()
+        except ValueError:
+            continue
+        if date < expiry:
+            os.remove(os.path.join(directory, file))
+
+
+def get_handler(log_directory: Union[DirectoryPath, NewPath]) -> logging.Handler:
+    """Creates the handler that writes the logs, as per the environment variables set.
+
+    Args:
+        log_directory: Directory to store logs.
+
+    Returns:
+        logging.Handler:
+        Returns the handler.
+
+    Notes:
+        - Log file is rotated at midnight, and rotated files beyond the log retention are deleted during the rollover.
+        - Dated log files from before the rotation are deleted as per the same retention, on the first run and
+          on each rollover, so the log directory is not scanned on every run.
+    """
+    if env.log == LogOptions.stdout:
+        handler = logging.StreamHandler()
+    else:
+        os.makedirs(log_directory, exist_ok=True)
+        filename = os.path.join(log_directory, "jarvis.log")
+        # Directory is scanned only on the first run after the switch to rotation, and on each rollover after that
+        cleanup = not os.path.isfile(filename)
+        handler = logging.handlers.TimedRotatingFileHandler(
+            filename=filename,
+            when="midnight",
+            backupCount=env.log_retention,
+        )
+        # Rollover is due when the last run was on a previous day, which has to happen before the spacing is added
+        if handler.shouldRollover(logging.makeLogRecord({})):
+            handler.doRollover()
+            cleanup = True
+        if cleanup:
+            cleanup_dated_logs(log_directory)
+        if env.log_format == LogFormat.text:
+            add_spacing(handler)
+    if env.log_format == LogFormat.json:
+        handler.setFormatter(fmt=JsonFormatter())
+    else:
+        handler.setFormatter(
+            fmt=logging.Formatter(
+                datefmt="%b-%d-%Y %I:%M:%S %p",
+                fmt="%(asctime)s - %(levelname)s - [%(module)s:%(lineno)d] - %(funcName)s - %(message)s",
+            )
+        )
+    return handler
 
 
 def get_logger(
@@ -129,30 +259,18 @@ def get_logger(
     Returns:
         logging.Logger:
         Returns the customized logger.
+
+    Notes:
+        Records are put in a queue and written by a single listener thread,
+        so logging never blocks the check on disk or the terminal.
     """
     logger = logging.getLogger(name)
-    log_filename = "jarvis_%d-%m-%Y.log"
-    log_file = datetime.now().strftime(os.path.join(log_directory, log_filename))
-    if env.log == LogOptions.file:
-        if os.path.isdir(log_directory):
-            Thread(
-                target=cleanup_logs,
-                kwargs=dict(directory=log_directory, filename=log_filename),
-                daemon=True,
-            ).start()
-            add_spacing(log_file)
-        else:
-            os.mkdir(log_directory)
-        handler = logging.FileHandler(filename=log_file, mode="a")
-    else:
-        handler = logging.StreamHandler()
-    handler.setFormatter(
-        fmt=logging.Formatter(
-            datefmt="%b-%d-%Y %I:%M:%S %p",
-            fmt="%(asctime)s - %(levelname)s - [%(module)s:%(lineno)d] - %(funcName)s - %(message)s",
-        )
-    )
-    logger.addHandler(hdlr=handler)
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, get_handler(log_directory))
+    listener.start()
+    # Stopping the listener flushes the records that are still in the queue
+    atexit.register(listener.stop)
+    logger.addHandler(hdlr=logging.handlers.QueueHandler(log_queue))
     if env.debug:
         logger.setLevel(level=logging.DEBUG)
     else:
@@ -184,30 +302,112 @@ class Constants(BaseModel):
     SKIPPER_FORMAT: str = "%H:%M"
     TIMEZONE: str = time.strftime("%Z %z")
     DATETIME: str = datetime.now().strftime("%B %d, %Y - %I:%M %p") + " " + TIMEZONE
-    NOTIFICATION: Union[FilePath, NewPath] = os.path.join(
-        REPOSITORY, "last_notify.yaml"
+    EMAIL_TEMPLATE: str = "email_template.html"
+    WEB_TEMPLATE: str = "web_template.html"
+    SHELL_TEMPLATE: str = "shell_template.html"
+    LOG_DIRECTORY: Union[DirectoryPath, NewPath] = os.path.join(REPOSITORY, "logs")
+    STATE_DIRECTORY: Union[DirectoryPath, NewPath] = os.path.join(REPOSITORY, "state")
+    SOURCE_CACHE: Union[FilePath, NewPath] = os.path.join(
+        REPOSITORY, "state", "source_map.pickle"
     )
-    EMAIL_TEMPLATE: Union[FilePath, NewPath] = os.path.join(
-        REPOSITORY, "templates", "email_template.html"
+    SPOOL: Union[FilePath, NewPath] = os.path.join(REPOSITORY, "state", "spool.json")
+    BREAKER_STATE: Union[FilePath, NewPath] = os.path.join(
+        REPOSITORY, "state", "breaker.json"
     )
-    WEB_TEMPLATE: Union[FilePath, NewPath] = os.path.join(
-        REPOSITORY, "templates", "web_template.html"
+    LOCK_FILE: Union[FilePath, NewPath] = os.path.join(REPOSITORY, "state", "run.lock")
+    DOCS_STATE: Union[FilePath, NewPath] = os.path.join(
+        REPOSITORY, "state", "docs.json"
+    )
+    HISTORY_FILE: Union[FilePath, NewPath] = os.path.join(
+        REPOSITORY, "state", "history.jsonl"
+    )
+    BASELINE_STATE: Union[FilePath, NewPath] = os.path.join(
+        REPOSITORY, "state", "baselines.json"
+    )
+    GOVERNOR_STATE: Union[FilePath, NewPath] = os.path.join(
+        REPOSITORY, "state", "governor.json"
+    )
+    OUTBOX: Union[FilePath, NewPath] = os.path.join(REPOSITORY, "state", "outbox.db")
+    UPTIME_STATE: Union[FilePath, NewPath] = os.path.join(
+        REPOSITORY, "state", "uptime.json"
+    )
+    UPTIME_FILE: Union[FilePath, NewPath] = os.path.join(
+        REPOSITORY, "state", "uptime_summary.json"
+    )
+    TIMINGS_FILE: Union[FilePath, NewPath] = os.path.join(
+        REPOSITORY, "state", "timings.jsonl"
+    )
+    PROFILE_DIRECTORY: Union[DirectoryPath, NewPath] = os.path.join(
+        REPOSITORY, "state", "profiles"
+    )
+    METRICS_DIRECTORY: Union[DirectoryPath, NewPath] = os.path.join(
+        REPOSITORY, "state", "metrics"
     )
-    LOG_DIRECTORY: Union[DirectoryPath, NewPath] = os.path.join(REPOSITORY, "logs")
     INDEX_FILE: Union[FilePath, NewPath] = os.path.join(
         REPOSITORY, "docs", "index.html"
     )
+    STATUS_JSON: Union[FilePath, NewPath] = os.path.join(
+        REPOSITORY, "docs", "status.json"
+    )
     BASE_URL: HttpUrl = "https://api.github.com/repos/thevickypedia/JarvisMonitor"
     DOCS_BRANCH: str = "docs"
     INDEX_URL: str = f"{BASE_URL}/contents/docs/index.html"
+    REF_URL: str = f"{BASE_URL}/git/ref/heads/{DOCS_BRANCH}"
+    REFS_URL: str = f"{BASE_URL}/git/refs/heads/{DOCS_BRANCH}"
+    TREES_URL: str = f"{BASE_URL}/git/trees"
+    COMMITS_URL: str = f"{BASE_URL}/git/commits"
+    INDEX_PATH: str = "docs/index.html"
+    STATUS_PATH: str = "docs/status.json"
+    HISTORY_PATH: str = "docs/history.jsonl"
+    UPTIME_PATH: str = "docs/uptime.json"
     DEFAULT_BRANCH: str = "main"
     COMMIT_MESSAGE: str = f"Updated as of {DATETIME}"
     webpage: Union[str, None] = get_webpage()
 
+    def refresh(self) -> None:
+        """Refreshes the time sensitive values, for long-running processes that outlive a single check."""
+        self.TIMEZONE = time.strftime("%Z %z")
+        self.DATETIME = (
+            datetime.now().strftime("%B %d, %Y - %I:%M %p") + " " + self.TIMEZONE
+        )
+        self.COMMIT_MESSAGE = f"Updated as of {self.DATETIME}"
+
+    def isolate(self, workspace: str) -> None:
+        """Points the state files and the published files to a workspace, for the tests and the benchmark.
+
+        Args:
+            workspace: Directory to hold the files, with the state files in a state directory within.
+
+        Notes:
+            Monitored modules open the state files at import, so this has to be called before importing them.
+        """
+        state_directory = str(self.STATE_DIRECTORY)
+        for name in type(self).model_fields:
+            value = getattr(self, name)
+            if isinstance(value, (str, os.PathLike)) and str(value).startswith(
+                state_directory
+            ):
+                setattr(
+                    self,
+                    name,
+                    str(value).replace(
+                        state_directory, os.path.join(workspace, "state")
+                    ),
+                )
+        self.INDEX_FILE = os.path.join(workspace, "index.html")
+        self.STATUS_JSON = os.path.join(workspace, "status.json")
+        os.makedirs(os.path.join(workspace, "state"), exist_ok=True)
+
 
 static = Constants()
 color_codes = ColorCode()
 LOGGER = get_logger("jarvis", static.LOG_DIRECTORY)
+os.makedirs(static.STATE_DIRECTORY, exist_ok=True)
+
+if env.collector_port and not env.daemon:
+    LOGGER.warning(
+        "Collector can receive snapshots from the agents only in daemon mode"
+    )
 
 if env.skip_schedule:
     try:
@@ -0,0 +1,58 @@
+import itertools
+import threading
+from concurrent.futures import Executor, Future
+from typing import Callable
+
+
+class DaemonExecutor(Executor):
+    """Executor that runs each call in a daemon thread, with a limit on the number of calls that run at once.
+
+    >>> DaemonExecutor
+
+    Notes:
+        - Threads of a ThreadPoolExecutor are joined when the interpreter exits, even after a shutdown without waiting,
+          so a call that outlives its timeout would keep a cron run alive until it returns.
+        - Daemon threads are abandoned at exit instead, along with the calls that are still running in them.
+    """
+
+    def __init__(self, max_workers: int, thread_name_prefix: str):
+        """Instantiates the slots for the calls that run at once.
+
+        Args:
+            max_workers: Number of calls that run at once, the rest wait for a slot in their own thread.
+            thread_name_prefix: Prefix for the name of the threads.
+        """
+        self.slots = threading.BoundedSemaphore(max_workers)
+        self.prefix = thread_name_prefix
+        self.counter = itertools.count()
+
+    def submit(self, fn: Callable, /, *args, **kwargs) -> Future:
+        """Submits a call to run in a daemon thread.
+
+        Args:
+            fn: Function to call.
+            *args: Arguments for the function.
+            **kwargs: Keyword arguments for the function.
+
+        Returns:
+            Future:
+            Returns the future for the result of the call.
+        """
+        future = Future()
+
+        def target() -> None:
+            """Runs the call once a slot is available, unless the future was cancelled by then."""
+            with self.slots:
+                if not future.set_running_or_notify_cancel():
+                    return
+                try:
+                    result = fn(*args, **kwargs)
+                except BaseException as error:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+
+        threading.Thread(
+            target=target, name=f"{self.prefix}_{next(self.counter)}", daemon=True
+        ).start()
+        return future
@@ -0,0 +1,162 @@
+import time
+from http.server import ThreadingHTTPServer
+from typing import Dict, List
+
+from models.constants import LOGGER
+from models.probes import Outcome
+from models.profiler import TIMINGS
+from models.server import QuietHandler, serve
+from models.snapshot import Snapshot
+from models.timeseries import STATUS_CODES
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Metric name, type and help text of the families exposed for the processes
+FAMILIES = {
+    "jarvis_process_status": (
+        "gauge",
+        "Status of the function (0: green, 1: yellow, 2: red, 3: blue).",
+    ),
+    "jarvis_process_up": ("gauge", "Whether the function is up."),
+    "jarvis_process_threads": ("gauge", "Number of threads used by the process."),
+    "jarvis_process_fds": (
+        "gauge",
+        "Number of file descriptors opened by the process.",
+    ),
+    "jarvis_process_rss_bytes": ("gauge", "Resident memory size of the process."),
+    "jarvis_process_cpu_seconds_total": (
+        "counter",
+        "User and system CPU time spent by the process.",
+    ),
+    "jarvis_process_cpu_percent": ("gauge", "CPU utilization of the process."),
+    "jarvis_process_open_files": ("gauge", "Number of files opened by the process."),
+    "jarvis_probe_up": ("gauge", "Whether the probe succeeded within its deadline."),
+    "jarvis_probe_latency_seconds": ("gauge", "Latency of the probe."),
+}
+# Pre-built exposition, so that a scrape never triggers process inspection
+EXPOSITION = {"body": b"", "checks": 0}
+SAMPLES: Dict[str, List[str]] = {}
+
+
+def escape(value: str) -> str:
+    """Escapes a label value as per the exposition format."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def add(name: str, labels: str, value: float | int) -> None:
+    """Adds a sample to the metric family.
+
+    Args:
+        name: Name of the metric family.
+        labels: Formatted labels for the sample.
+        value: Value of the sample.
+    """
+    SAMPLES.setdefault(name, []).append(f"{name}{{{labels}}} {value}")
+
+
+def record(
+    status: Dict[str, str],
+    data: Dict[str, Dict[int, List[str]]],
+    snapshots: Dict[int, Snapshot],
+    outcomes: Dict[str, List[Outcome]],
+) -> None:
+    """Records the state and the metrics of all the processes from the current check.
+
+    Args:
+        status: Function name and color name as key-value pair.
+        data: Processes mapping.
+        snapshots: Snapshots of all the processes, collected in a single pass.
+        outcomes: Outcome of the probes for each function.
+    """
+    SAMPLES.clear()
+    for func_name, color in status.items():
+        function = escape(func_name)
+        add(
+            "jarvis_process_status",
+            f'function="{function}",color="{color}"',
+            STATUS_CODES[color],
+        )
+        add("jarvis_process_up", f'function="{function}"', int(color != "red"))
+        for pid in data.get(func_name, {}):
+            if not (snapshot := snapshots.get(pid)):
+                continue
+            labels = f'function="{function}",pid="{pid}"'
+            add("jarvis_process_threads", labels, snapshot.threads)
+            add("jarvis_process_fds", labels, snapshot.fds)
+            add("jarvis_process_rss_bytes", labels, snapshot.rss)
+            add("jarvis_process_cpu_seconds_total", labels, snapshot.cpu_time)
+            if snapshot.cpu is not None:
+                add("jarvis_process_cpu_percent", labels, snapshot.cpu)
+            if snapshot.open_files is not None:
+                add("jarvis_process_open_files", labels, snapshot.open_files)
+    for func_name, func_outcomes in outcomes.items():
+        for outcome in func_outcomes:
+            labels = (
+                f'function="{escape(func_name)}",kind="{outcome.probe.kind}",'
+                f'target="{escape(outcome.probe.target)}"'
+            )
+            add("jarvis_probe_up", labels, int(not outcome.error))
+            if outcome.latency is not None:
+                add("jarvis_probe_latency_seconds", labels, f"{outcome.latency:.6f}")
+
+
+def publish() -> None:
+    """Builds the exposition from the recorded metrics and the phase timings, at the end of each check."""
+    EXPOSITION["checks"] += 1
+    lines = []
+    for name, samples in SAMPLES.items():
+        metric_type, description = FAMILIES[name]
+        lines.extend(
+            (f"# HELP {name} {description}", f"# TYPE {name} {metric_type}", *samples)
+        )
+    lines.extend(
+        (
+            "# HELP jarvis_monitor_phase_seconds Duration of each phase in the last check.",
+            "# TYPE jarvis_monitor_phase_seconds gauge",
+            *(
+                f'jarvis_monitor_phase_seconds{{phase="{escape(phase)}"}} {duration:.6f}'
+                for phase, duration in TIMINGS.items()
+            ),
+            "# HELP jarvis_monitor_checks_total Number of checks since the monitor started.",
+            "# TYPE jarvis_monitor_checks_total counter",
+            f"jarvis_monitor_checks_total {EXPOSITION['checks']}",
+            "# HELP jarvis_monitor_last_check_timestamp_seconds Epoch time of the last check.",
+            "# TYPE jarvis_monitor_last_check_timestamp_seconds gauge",
+            f"jarvis_monitor_last_check_timestamp_seconds {time.time():.3f}",
+        )
+    )
+    EXPOSITION["body"] = ("\n".join(lines) + "\n").encode()
+
+
+class Handler(QuietHandler):
+    """Request handler that serves the pre-built exposition.
+
+    >>> Handler
+
+    """
+
+    def do_GET(self) -> None:
+        """Serves the metrics endpoint."""
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = EXPOSITION["body"]
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start(port: int) -> ThreadingHTTPServer:
+    """Starts the metrics endpoint in a daemon thread.
+
+    Args:
+        port: Port number to listen on.
+
+    Returns:
+        ThreadingHTTPServer:
+        Returns the server object.
+    """
+    server = serve(port, Handler)
+    LOGGER.info("Serving metrics at http://0.0.0.0:%d/metrics", port)
+    return server
@@ -0,0 +1,93 @@
+from typing import Dict
+
+import psutil
+
+from models import storage
+from models.constants import LOGGER, env, static
+
+# Tiers in the order of their depth, each cheaper than the previous one
+FULL, REDUCED, MINIMAL = 0, 1, 2
+TIERS = {
+    FULL: "full",
+    REDUCED: "reduced",
+    MINIMAL: "minimal",
+}
+# Multiplier for the interval in daemon mode, for each tier
+INTERVALS = {FULL: 1, REDUCED: 1, MINIMAL: 2}
+# Number of consecutive checks within the budget, before moving up a tier
+RECOVERY = 3
+STATE: Dict[str, int] = {}
+
+
+def load_state() -> Dict[str, int]:
+    """Loads the current tier and the number of consecutive checks within the budget, only once per process."""
+    if not STATE:
+        STATE.update(tier=FULL, healthy=0)
+        STATE.update(storage.load(static.GOVERNOR_STATE) or {})
+    return STATE
+
+
+def dump_state() -> None:
+    """Dumps the current tier and the number of consecutive checks within the budget."""
+    storage.dump(static.GOVERNOR_STATE, STATE)
+
+
+def get_tier() -> int:
+    """Gets the current tier."""
+    return load_state()["tier"]
+
+
+def get_interval() -> int:
+    """Gets the interval for the current tier, in seconds."""
+    return env.interval * INTERVALS[get_tier()]
+
+
+def get_load() -> float:
+    """Gets the load average over the last minute, as a percentage of the number of CPUs in the host."""
+    return psutil.getloadavg()[0] / (psutil.cpu_count() or 1) * 100
+
+
+def update(record: Dict[str, float | int]) -> None:
+    """Moves the tier down when the monitor exceeds its budget or the host is under pressure, and up once it recovers.
+
+    Args:
+        record: Summary of the check, with the CPU time used and the resident memory size of the monitor.
+
+    Notes:
+        - Overhead is the CPU time used by the check, as a percentage of the interval between each check.
+        - Tier moves down by one on each check over the budget, and up by one after consecutive checks within it.
+    """
+    state = load_state()
+    overhead = record["cpu"] / env.interval * 100
+    memory = record["rss"] / 1_048_576
+    load = get_load()
+    pressure = []
+    if overhead > env.overhead_budget:
+        pressure.append(f"overhead {overhead:.2f}% > {env.overhead_budget}%")
+    if memory > env.memory_budget:
+        pressure.append(f"memory {memory:.0f}MB > {env.memory_budget}MB")
+    if load > env.load_limit:
+        pressure.append(f"host load {load:.0f}% > {env.load_limit}%")
+    previous = dict(state)
+    tier = state["tier"]
+    if pressure:
+        state.update(tier=min(tier + 1, MINIMAL), healthy=0)
+    elif tier > FULL:
+        state["healthy"] += 1
+        if state["healthy"] >= RECOVERY:
+            state.update(tier=tier - 1, healthy=0)
+    if state["tier"] > tier:
+        LOGGER.warning(
+            "Moving from %s to %s checks, due to %s",
+            TIERS[tier],
+            TIERS[state["tier"]],
+            ", ".join(pressure),
+        )
+    elif state["tier"] < tier:
+        LOGGER.info(
+            "Moving from %s to %s checks, since the host has recovered",
+            TIERS[tier],
+            TIERS[state["tier"]],
+        )
+    if state != previous:
+        dump_state()
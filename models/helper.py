@@ -1,95 +1,191 @@
-import os
-import time
+import hashlib
+import json
+import smtplib
 from typing import Dict
 
 import gmailconnector
-import jinja2
-import psutil
-import yaml
 
+from models import outbox
+from models.baseline import observe
 from models.conditions import all_pids_are_red, main_process_is_red, some_pids_are_red
-from models.constants import LOGGER, env, static
+from models.constants import LOGGER, color_codes, env, static
+from models.history import COLORS
+from models.snapshot import Snapshot, Tree
+from models.templates import render
 
+MAILER: Dict[str, gmailconnector.SendEmail] = {}
 
-def check_performance(process: psutil.Process) -> Dict[str, float | int] | None:
-    """Checks performance by monitoring CPU utilization, number of threads and open files.
+
+def digest(status: dict) -> str:
+    """Generates a canonical hash for the semantic status, so that changes can be detected without comparing HTML.
 
     Args:
-        process: Process object.
+        status: Translated status dictionary.
 
     Returns:
-        Dict[str, int]:
-        Returns a dictionary of metrics and their values as key-value pair.
+        str:
+        Returns the hexadecimal digest of the status.
     """
-    name = process.func  # noqa
-    cpu = process.cpu_percent(interval=0.5)
-    threads = process.num_threads()
-    open_files = len(process.open_files())
-    info_dict = {"cpu": cpu, "threads": threads, "open_files": open_files}
-    LOGGER.info({f"{name} [{process.pid}]": info_dict})
-    if cpu > 50 or open_files > 50:  # current threshold for Jarvis
-        LOGGER.critical("%s [%d] should be optimized", name, process.pid)
-        return info_dict
+    return hashlib.sha256(
+        json.dumps(status, sort_keys=True, separators=(",", ":")).encode()
+    ).hexdigest()
 
 
-def send_email(status: dict = None) -> None:
-    """Sends an email notification if Jarvis is down.
+def check_performance(
+    name: str, snapshot: Snapshot, position: int
+) -> Dict[str, float | int] | None:
+    """Checks performance by comparing CPU utilization, threads, file descriptors and open files against the baseline.
 
     Args:
-        status: Translated status dictionary.
+        name: Function name.
+        snapshot: Snapshot of the process.
+        position: Position of the process in the mapping of the function.
+
+    Returns:
+        Dict[str, float | int]:
+        Returns a dictionary of the metrics that are above the baseline and their values as key-value pair.
     """
-    if not all((env.gmail_user, env.gmail_pass, env.recipient)):
-        LOGGER.warning("Not all env vars are present for sending an email!!")
-        return
-    if not status:
-        LOGGER.warning("Jarvis is in maintenance mode.")
-        return
-    if all_pids_are_red(status=status):
-        state = "issue"
-        subject = f"Service disrupted by an external force - {static.DATETIME}"
-    elif main_process_is_red(status=status):
-        state = "notice"
-        subject = f"Main functionality degraded - {static.DATETIME}"
-    elif some_pids_are_red(status=status):
-        state = "warning"
-        subject = f"Some components degraded - {static.DATETIME}"
-    else:
+    metrics = {
+        key: value
+        for key, value in (
+            ("cpu", snapshot.cpu),
+            ("threads", snapshot.threads),
+            ("fds", snapshot.fds),
+            ("open_files", snapshot.open_files),
+        )
+        if value is not None
+    }
+    LOGGER.info({f"{name} [{snapshot.pid}]": metrics})
+    # Each process has its own baseline, keyed by its position since the PID changes when Jarvis restarts
+    if anomalies := observe(f"{name}[{position}]", metrics):
         LOGGER.critical(
-            "`notify` flag was set to True without any components being affected."
+            "%s [%d] should be optimized, %s is above the baseline",
+            name,
+            snapshot.pid,
+            ", ".join(anomalies),
         )
-        return
-    if os.path.isfile(static.NOTIFICATION):
-        with open(static.NOTIFICATION) as file:
-            data = yaml.load(stream=file, Loader=yaml.FullLoader)
-        if data.get(state) and time.time() - data[state] < 43_200:
-            LOGGER.info("Last email was sent within an hour.")
-            return
+        return {key: round(value, 2) for key, value in anomalies.items()}
+
+
+def check_thresholds(
+    name: str, tree: Tree, thresholds: Dict[str, float]
+) -> Dict[str, float | int] | None:
+    """Checks the resource usage of the process tree against the thresholds set for the function.
+
+    Args:
+        name: Function name.
+        tree: Resource usage aggregated over the process tree.
+        thresholds: Metric name and the upper limit as key-value pair.
+
+    Returns:
+        Dict[str, float | int]:
+        Returns a dictionary of the metrics that breached the threshold and their values as key-value pair.
+    """
+    LOGGER.debug({name: tree._asdict()})
+    breached = {
+        key: round(value, 2)
+        for key, limit in thresholds.items()
+        if (value := getattr(tree, key)) is not None and value > limit
+    }
+    if breached:
+        LOGGER.critical("%s has breached the thresholds: %s", name, breached)
+        return breached
+
+
+def get_mailer() -> gmailconnector.SendEmail | None:
+    """Gets an authenticated connection to Gmail, re-using the one from a previous notification when still alive.
+
+    Returns:
+        gmailconnector.SendEmail:
+        Returns the email object.
+    """
+    if (mailer := MAILER.get("gmail")) and mailer.server:
+        try:
+            if mailer.server.noop()[0] == 250:
+                return mailer
+        except (smtplib.SMTPException, OSError) as error:
+            LOGGER.debug(error)
     try:
-        email_obj = gmailconnector.SendEmail(
+        mailer = gmailconnector.SendEmail(
             gmail_user=env.gmail_user, gmail_pass=env.gmail_pass
         )
     except ValueError as error:
         LOGGER.critical(error)
         return
-    auth = email_obj.authenticate
+    auth = mailer.authenticate
     if not auth.ok:
         LOGGER.critical(auth.body)
         return
-    LOGGER.info("Sending email")
-    with open(static.EMAIL_TEMPLATE) as email_temp:
-        template_data = email_temp.read()
-    template = jinja2.Template(template_data)
-    content = template.render(result=status, webpage=static.webpage)
-    response = email_obj.send_email(
-        subject=subject,
-        html_body=content,
-        sender="JarvisMonitor",
-        recipient=env.recipient,
+    MAILER["gmail"] = mailer
+    return mailer
+
+
+def send_email(status: dict = None, notify: bool = True) -> None:
+    """Records the alerts in the outbox, and sends an email notification if Jarvis is down.
+
+    Args:
+        status: Translated status dictionary.
+        notify: Boolean flag to indicate that the processes in red have to be notified.
+
+    Notes:
+        - Alerts are keyed by the function and severity, so an alert that stays active is notified only once.
+        - Alerts that pile up within the digest window are combined into a single email.
+        - Emails that fail are retried with a backoff, over the same connection for all the pending emails.
+    """
+    if not all((env.gmail_user, env.gmail_pass, env.recipient)):
+        if notify:
+            LOGGER.warning("Not all env vars are present for sending an email!!")
+        return
+    if notify and not status:
+        LOGGER.warning("Jarvis is in maintenance mode.")
+        return
+    outbox.record(
+        {
+            (key, COLORS[value[0]]): value[1]
+            for key, value in (status or {}).items()
+            if notify and value[0] == color_codes.red
+        }
     )
-    if response.ok:
-        LOGGER.info("Status report has been sent.")
-        with open(static.NOTIFICATION, "w") as file:
-            yaml.dump(data={state: time.time()}, stream=file)
-            file.flush()
-    else:
-        LOGGER.critical("CRITICAL::FAILED TO SEND STATUS REPORT!!")
+    if alerts := outbox.get_due(env.notify_digest):
+        if all_pids_are_red(status=status):
+            subject = f"Service disrupted by an external force - {static.DATETIME}"
+        elif main_process_is_red(status=status):
+            subject = f"Main functionality degraded - {static.DATETIME}"
+        elif some_pids_are_red(status=status):
+            subject = f"Some components degraded - {static.DATETIME}"
+        else:
+            LOGGER.critical(
+                "`notify` flag was set to True without any components being affected."
+            )
+            return
+        content = render(static.EMAIL_TEMPLATE, result=status, webpage=static.webpage)
+        outbox.enqueue(alerts, subject, content)
+        LOGGER.info("Queued a notification for %d alert(s)", len(alerts))
+    if not (deliveries := outbox.get_deliveries()):
+        return
+    mailer = get_mailer()
+    for delivery_id, subject, content, attempts in deliveries:
+        if not mailer:
+            outbox.mark_failed(delivery_id, attempts + 1, "authentication failed")
+            continue
+        LOGGER.info("Sending email")
+        try:
+            response = mailer.send_email(
+                subject=subject,
+                html_body=content,
+                sender="JarvisMonitor",
+                recipient=env.recipient,
+            )
+            ok, error = response.ok, response.body
+        except (smtplib.SMTPException, OSError) as exception:
+            ok, error = False, str(exception)
+        if ok:
+            LOGGER.info("Status report has been sent.")
+            outbox.mark_sent(delivery_id)
+        else:
+            LOGGER.critical("CRITICAL::FAILED TO SEND STATUS REPORT!!")
+            LOGGER.critical(error)
+            outbox.mark_failed(delivery_id, attempts + 1, error)
+            # Connection is re-created for the next delivery, in case it was dropped
+            MAILER.pop("gmail", None)
+            mailer = get_mailer()
@@ -0,0 +1,76 @@
+import json
+import time
+from typing import Dict, List
+
+from models import storage
+from models.constants import LOGGER, color_codes, env, static
+
+COLORS = {value: key for key, value in color_codes.model_dump().items()}
+
+
+def load_history() -> List[Dict[str, float | Dict[str, str]]]:
+    """Loads the status history stored locally.
+
+    Returns:
+        List[Dict[str, float | Dict[str, str]]]:
+        Returns a list of status changes, along with the timestamp.
+    """
+    try:
+        with open(static.HISTORY_FILE) as file:
+            return [json.loads(line) for line in file if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def dump_history(history: List[Dict[str, float | Dict[str, str]]]) -> None:
+    """Dumps the status history into the local file, replacing the existing content atomically.
+
+    Args:
+        history: List of status changes, along with the timestamp.
+    """
+    storage.write(
+        static.HISTORY_FILE, "".join(json.dumps(entry) + "\n" for entry in history)
+    )
+
+
+def record(status: dict) -> bool:
+    """Records the status into the local history, only when it is different from the last recorded status.
+
+    Args:
+        status: Translated status dictionary.
+
+    Returns:
+        bool:
+        Returns a boolean flag to indicate if any of the processes turned red since the last recorded status.
+    """
+    current = {key: COLORS.get(value[0], value[0]) for key, value in status.items()}
+    history = load_history()
+    previous = history[-1]["status"] if history else {}
+    if current == previous:
+        return False
+    now = time.time()
+    history.append({"timestamp": now, "status": current})
+    expiry = now - env.history_retention * 86_400
+    if history[0]["timestamp"] < expiry:
+        dump_history([entry for entry in history if entry["timestamp"] >= expiry])
+    else:
+        with open(static.HISTORY_FILE, "a") as file:
+            file.write(json.dumps(history[-1]) + "\n")
+            file.flush()
+    turned_red = [
+        key
+        for key, value in current.items()
+        if value == "red" and previous.get(key) != "red"
+    ]
+    if turned_red:
+        LOGGER.info("Processes turned red: %s", ", ".join(turned_red))
+    return bool(turned_red)
+
+
+def get_history() -> str:
+    """Gets the content of the local history file, to be published along with the index file."""
+    try:
+        with open(static.HISTORY_FILE) as file:
+            return file.read()
+    except FileNotFoundError:
+        return ""
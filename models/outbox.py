@@ -0,0 +1,176 @@
+import json
+import sqlite3
+import time
+from typing import Dict, List, Tuple
+
+from models.constants import static
+
+# Seconds after which an alert that is still active is notified again
+THROTTLE = 43_200
+# Number of attempts for a delivery, with the wait between each attempt doubling up to an hour
+MAX_ATTEMPTS = 5
+# Seconds to retain the deliveries that were sent
+RETENTION = 2_592_000
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    function TEXT NOT NULL,
+    severity TEXT NOT NULL,
+    impact TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    occurrences INTEGER NOT NULL DEFAULT 1,
+    notified_at REAL,
+    PRIMARY KEY (function, severity)
+);
+CREATE TABLE IF NOT EXISTS deliveries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    created REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    sent_at REAL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS deliveries_due ON deliveries (sent_at, next_attempt);
+"""
+CONNECTION: Dict[str, sqlite3.Connection] = {}
+
+
+def connect() -> sqlite3.Connection:
+    """Connects to the outbox, creating the tables when used for the first time.
+
+    Returns:
+        sqlite3.Connection:
+        Returns the connection object, which is re-used for the lifetime of the process.
+    """
+    if not (connection := CONNECTION.get("outbox")):
+        # Connection is used by one notification at a time, but not always from the same worker thread
+        connection = sqlite3.connect(static.OUTBOX, check_same_thread=False)
+        connection.executescript(SCHEMA)
+        CONNECTION["outbox"] = connection
+    return connection
+
+
+def record(alerts: Dict[Tuple[str, str], List[str]]) -> None:
+    """Records the active alerts, and resolves the ones that are no longer active.
+
+    Args:
+        alerts: Function name and severity as the key, and the impact as the value.
+
+    Notes:
+        An alert that is already in the outbox is only updated, so an alert that stays active is notified only once.
+    """
+    now = time.time()
+    connection = connect()
+    with connection:
+        connection.executemany(
+            "INSERT INTO alerts (function, severity, impact, first_seen, last_seen) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (function, severity) DO UPDATE SET "
+            "impact = excluded.impact, last_seen = excluded.last_seen, occurrences = occurrences + 1",
+            [
+                (function, severity, json.dumps(impact), now, now)
+                for (function, severity), impact in alerts.items()
+            ],
+        )
+        # Alerts that were not seen in this check are resolved, so that they are notified again when they recur
+        connection.execute("DELETE FROM alerts WHERE last_seen < ?", (now,))
+
+
+def get_due(window: int) -> List[Tuple[str, str]]:
+    """Gets the alerts to be notified, once the oldest of them has waited for the digest window.
+
+    Args:
+        window: Seconds to wait for the alerts to pile up, before they are combined into a single notification.
+
+    Returns:
+        List[Tuple[str, str]]:
+        Returns the function name and severity of the alerts to be notified.
+    """
+    now = time.time()
+    rows = (
+        connect()
+        .execute(
+            "SELECT function, severity, first_seen FROM alerts "
+            "WHERE notified_at IS NULL OR notified_at < ?",
+            (now - THROTTLE,),
+        )
+        .fetchall()
+    )
+    if rows and min(row[2] for row in rows) <= now - window:
+        return [(function, severity) for function, severity, _ in rows]
+    return []
+
+
+def enqueue(alerts: List[Tuple[str, str]], subject: str, body: str) -> None:
+    """Adds a delivery for the alerts, and marks them as notified.
+
+    Args:
+        alerts: Function name and severity of the alerts that are notified.
+        subject: Subject of the email.
+        body: Content of the email.
+    """
+    now = time.time()
+    connection = connect()
+    with connection:
+        connection.executemany(
+            "UPDATE alerts SET notified_at = ? WHERE function = ? AND severity = ?",
+            [(now, function, severity) for function, severity in alerts],
+        )
+        connection.execute(
+            "INSERT INTO deliveries (subject, body, created, next_attempt) VALUES (?, ?, ?, ?)",
+            (subject, body, now, now),
+        )
+
+
+def get_deliveries() -> List[Tuple[int, str, str, int]]:
+    """Gets the deliveries that are due for an attempt.
+
+    Returns:
+        List[Tuple[int, str, str, int]]:
+        Returns the ID, subject, body and the number of previous attempts for each delivery.
+    """
+    return (
+        connect()
+        .execute(
+            "SELECT id, subject, body, attempts FROM deliveries "
+            "WHERE sent_at IS NULL AND next_attempt <= ? AND attempts < ? ORDER BY id",
+            (time.time(), MAX_ATTEMPTS),
+        )
+        .fetchall()
+    )
+
+
+def mark_sent(delivery_id: int) -> None:
+    """Marks a delivery as sent, and deletes the ones that were sent beyond the retention.
+
+    Args:
+        delivery_id: ID of the delivery.
+    """
+    now = time.time()
+    connection = connect()
+    with connection:
+        connection.execute(
+            "UPDATE deliveries SET sent_at = ?, attempts = attempts + 1, error = NULL WHERE id = ?",
+            (now, delivery_id),
+        )
+        connection.execute(
+            "DELETE FROM deliveries WHERE created < ?", (now - RETENTION,)
+        )
+
+
+def mark_failed(delivery_id: int, attempts: int, error: str) -> None:
+    """Marks a delivery as failed, and schedules the next attempt with an exponential backoff.
+
+    Args:
+        delivery_id: ID of the delivery.
+        attempts: Number of attempts including the failed one.
+        error: Reason for the failure.
+    """
+    backoff = min(60 * 2 ** (attempts - 1), 3_600)
+    connection = connect()
+    with connection:
+        connection.execute(
+            "UPDATE deliveries SET attempts = ?, next_attempt = ?, error = ? WHERE id = ?",
+            (attempts, time.time() + backoff, error, delivery_id),
+        )
@@ -0,0 +1,211 @@
+import socket
+import time
+from concurrent.futures import Future, wait
+from typing import Dict, List, NamedTuple, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from models.constants import LOGGER, env
+from models.executor import DaemonExecutor
+
+# Kinds of probes, each keyed by its target in the source map
+KINDS = ("http", "tcp", "unix")
+# Bounded pool for the probes, sized as the connection pool so that every worker can keep a connection alive
+WORKERS = 8
+EXECUTOR = DaemonExecutor(max_workers=WORKERS, thread_name_prefix="probe")
+SESSION: Dict[str, requests.Session] = {}
+
+
+class Probe(NamedTuple):
+    """Definition of an active probe for a function.
+
+    >>> Probe
+
+    """
+
+    kind: str
+    target: str
+    timeout: float
+    latency: float
+
+
+class Outcome(NamedTuple):
+    """Outcome of an active probe.
+
+    >>> Outcome
+
+    """
+
+    probe: Probe
+    latency: float | None
+    error: str | None = None
+
+
+def parse(func_name: str, definitions: List[Dict[str, str | float]]) -> List[Probe]:
+    """Parses the probe definitions of a function from the source map.
+
+    Args:
+        func_name: Function name.
+        definitions: List of mappings with the kind of the probe as the key and its target as the value,
+            along with an optional timeout and latency.
+
+    Returns:
+        List[Probe]:
+        Returns the list of valid probes.
+    """
+    probes = []
+    for definition in definitions if isinstance(definitions, list) else [definitions]:
+        kinds = [kind for kind in KINDS if kind in (definition or {})]
+        if len(kinds) != 1:
+            LOGGER.warning("Invalid probe for '%s': %s", func_name, definition)
+            continue
+        try:
+            probe = Probe(
+                kind=kinds[0],
+                target=str(definition[kinds[0]]),
+                timeout=float(definition.get("timeout", env.probe_timeout)),
+                latency=float(definition.get("latency", env.probe_latency)),
+            )
+        except (TypeError, ValueError):
+            LOGGER.warning("Invalid probe for '%s': %s", func_name, definition)
+            continue
+        probes.append(probe)
+    return probes
+
+
+def get_session() -> requests.Session:
+    """Gets the session for HTTP probes, which keeps the connections alive between checks in daemon mode."""
+    if not (session := SESSION.get("probe")):
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=WORKERS, pool_maxsize=WORKERS, max_retries=0
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        SESSION["probe"] = session
+    return session
+
+
+def connect(probe: Probe) -> None:
+    """Opens and closes a connection to the TCP port or the unix socket."""
+    if probe.kind == "tcp":
+        host, port = probe.target.rsplit(":", 1)
+        socket.create_connection((host, int(port)), timeout=probe.timeout).close()
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(probe.timeout)
+        sock.connect(probe.target)
+
+
+def run(probe: Probe) -> Outcome:
+    """Runs a probe and measures its latency.
+
+    Args:
+        probe: Probe to run.
+
+    Returns:
+        Outcome:
+        Returns the latency in seconds, along with the error if the probe failed.
+    """
+    start = time.perf_counter()
+    try:
+        if probe.kind == "http":
+            response = get_session().get(probe.target, timeout=probe.timeout)
+            if not response.ok:
+                return Outcome(
+                    probe, time.perf_counter() - start, f"HTTP {response.status_code}"
+                )
+        else:
+            connect(probe)
+    except (requests.RequestException, OSError, ValueError) as error:
+        return Outcome(probe, None, type(error).__name__)
+    return Outcome(probe, time.perf_counter() - start)
+
+
+def submit(probes: Dict[str, List[Probe]]) -> Dict[str, List[Tuple[Probe, Future]]]:
+    """Submits the probes of all the functions to run concurrently.
+
+    Args:
+        probes: Function name and the list of probes as key-value pair.
+
+    Returns:
+        Dict[str, List[Tuple[Probe, Future]]]:
+        Returns the pending probes for each function.
+    """
+    return {
+        func_name: [(probe, EXECUTOR.submit(run, probe)) for probe in func_probes]
+        for func_name, func_probes in probes.items()
+    }
+
+
+def gather(
+    pending: Dict[str, List[Tuple[Probe, Future]]], started: float
+) -> Dict[str, List[Outcome]]:
+    """Waits for the pending probes until the deadline of the slowest one.
+
+    Args:
+        pending: Pending probes for each function.
+        started: Time at which the probes were submitted, from the performance counter.
+
+    Returns:
+        Dict[str, List[Outcome]]:
+        Returns the outcome of the probes for each function.
+
+    Notes:
+        A probe that is still running at its deadline fails with a timeout, and is left to finish in the background.
+    """
+    if not pending:
+        return {}
+    deadline = max(
+        probe.timeout for func_probes in pending.values() for probe, _ in func_probes
+    )
+    wait(
+        [future for func_probes in pending.values() for _, future in func_probes],
+        timeout=max(0.0, started + deadline - time.perf_counter()),
+    )
+    outcomes = {}
+    for func_name, func_probes in pending.items():
+        outcomes[func_name] = []
+        for probe, future in func_probes:
+            if not future.done():
+                future.cancel()
+                outcomes[func_name].append(Outcome(probe, None, "Timeout"))
+                continue
+            outcome = future.result()
+            # Timeout of the client applies to each read, so the deadline is enforced on the total latency
+            if outcome.latency is not None and outcome.latency > probe.timeout:
+                outcome = Outcome(probe, outcome.latency, "Timeout")
+            outcomes[func_name].append(outcome)
+    return outcomes
+
+
+def check(name: str, outcomes: List[Outcome]) -> Tuple[List[str], List[str]]:
+    """Checks the outcome of the probes of a function.
+
+    Args:
+        name: Function name.
+        outcomes: Outcome of each probe.
+
+    Returns:
+        Tuple[List[str], List[str]]:
+        Returns the description of the probes that failed, and the ones that were slower than their latency.
+    """
+    failed, slow = [], []
+    for outcome in outcomes:
+        probe = outcome.probe
+        if outcome.error:
+            LOGGER.critical("%s probe %s failed: %s", name, probe.target, outcome.error)
+            failed.append(f"{probe.kind} {probe.target}: {outcome.error}")
+        elif outcome.latency > probe.latency:
+            LOGGER.warning(
+                "%s probe %s took %.3fs, above %.3fs",
+                name,
+                probe.target,
+                outcome.latency,
+                probe.latency,
+            )
+            slow.append(f"{probe.kind} {probe.target}: {outcome.latency:.3f}s")
+        else:
+            LOGGER.debug("%s probe %s took %.3fs", name, probe.target, outcome.latency)
+    return failed, slow
@@ -0,0 +1,159 @@
+import atexit
+import contextlib
+import cProfile
+import json
+import logging
+import logging.handlers
+import os
+import pstats
+import queue
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List
+
+import psutil
+
+from models.constants import LOGGER, env, static
+
+TIMINGS: Dict[str, float] = {}
+# Profiles of the calls that ran in worker threads, since cProfile only profiles the thread that enabled it
+PROFILES: List[cProfile.Profile] = []
+PROCESS = psutil.Process()
+
+
+def get_summary_logger() -> logging.Logger:
+    """Creates a logger that writes one summary record per run into a rotating file.
+
+    Returns:
+        logging.Logger:
+        Returns the summary logger.
+
+    Notes:
+        Records are written by a listener thread of its own, the same way as the regular log.
+    """
+    logger = logging.getLogger("jarvis.timings")
+    # Summary records are not meant for the regular log
+    logger.propagate = False
+    handler = logging.handlers.RotatingFileHandler(
+        filename=static.TIMINGS_FILE,
+        maxBytes=1_048_576,
+        backupCount=env.log_retention,
+        # Opened by the listener thread on the first record, instead of at import
+        delay=True,
+    )
+    handler.setFormatter(logging.Formatter(fmt="%(message)s"))
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    listener.start()
+    # Stopping the listener flushes the records that are still in the queue
+    atexit.register(listener.stop)
+    logger.addHandler(hdlr=logging.handlers.QueueHandler(log_queue))
+    logger.setLevel(level=logging.INFO)
+    return logger
+
+
+SUMMARY = get_summary_logger()
+
+
+@contextlib.contextmanager
+def span(name: str) -> Iterator[None]:
+    """Times a phase of the check, and stores the duration in seconds.
+
+    Args:
+        name: Name of the phase.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        TIMINGS[name] = TIMINGS.get(name, 0.0) + time.perf_counter() - start
+
+
+def cleanup_profiles(retain: int = 60) -> None:
+    """Deletes the oldest profile dumps, retaining only the latest ones.
+
+    Args:
+        retain: Number of profile dumps to retain.
+    """
+    profiles = sorted(os.listdir(static.PROFILE_DIRECTORY))
+    for file in profiles[:-retain]:
+        os.remove(os.path.join(static.PROFILE_DIRECTORY, file))
+
+
+def traced(func: Callable, *args) -> Any:
+    """Runs a function in the current thread, profiling it when enabled to be merged with the profile of the run.
+
+    Args:
+        func: Function to run.
+        *args: Arguments for the function.
+
+    Returns:
+        Any:
+        Returns the return value of the function.
+    """
+    if not env.profile:
+        return func(*args)
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError as error:
+        # Python 3.12+ profiles all the threads with the profiler of the run, and allows only one to be active
+        LOGGER.debug(error)
+        return func(*args)
+    try:
+        return func(*args)
+    finally:
+        profiler.disable()
+        PROFILES.append(profiler)
+
+
+@contextlib.contextmanager
+def profile() -> Iterator[None]:
+    """Profiles a run with cProfile when enabled, and dumps the stats that can be loaded with pstats or snakeviz."""
+    if not env.profile:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        os.makedirs(static.PROFILE_DIRECTORY, exist_ok=True)
+        filename = datetime.now().strftime("%Y-%m-%d_%H-%M-%S.prof")
+        stats = pstats.Stats(profiler)
+        while PROFILES:
+            stats.add(PROFILES.pop())
+        stats.dump_stats(os.path.join(static.PROFILE_DIRECTORY, filename))
+        cleanup_profiles()
+
+
+@contextlib.contextmanager
+def instrument() -> Iterator[Dict[str, float | int]]:
+    """Instruments a run, to time and profile all the phases and write a summary record at the end.
+
+    Yields:
+        Dict[str, float | int]:
+        Yields the summary record, which is filled in once the run is complete.
+    """
+    TIMINGS.clear()
+    cpu_times = PROCESS.cpu_times()
+    failed = True
+    record = {}
+    try:
+        with profile(), span("total"):
+            yield record
+        failed = False
+    finally:
+        cpu_used = sum(PROCESS.cpu_times()[:2]) - sum(cpu_times[:2])
+        record.update(
+            {
+                "timestamp": round(time.time(), 3),
+                "phases": {key: round(value, 6) for key, value in TIMINGS.items()},
+                "cpu": round(cpu_used, 6),
+                "rss": PROCESS.memory_info().rss,
+                "failed": failed,
+            }
+        )
+        LOGGER.debug(record)
+        SUMMARY.info(json.dumps(record))
@@ -0,0 +1,33 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Type
+
+from models.constants import LOGGER
+
+
+class QuietHandler(BaseHTTPRequestHandler):
+    """Request handler that logs the requests at debug level, instead of writing to stderr.
+
+    >>> QuietHandler
+
+    """
+
+    def log_message(self, format: str, *args) -> None:
+        """Logs the requests at debug level."""
+        LOGGER.debug(format, *args)
+
+
+def serve(port: int, handler: Type[BaseHTTPRequestHandler]) -> ThreadingHTTPServer:
+    """Starts a server on all the interfaces, in a daemon thread.
+
+    Args:
+        port: Port number to listen on.
+        handler: Request handler class.
+
+    Returns:
+        ThreadingHTTPServer:
+        Returns the server object.
+    """
+    server = ThreadingHTTPServer(("0.0.0.0", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
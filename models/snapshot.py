@@ -0,0 +1,277 @@
+import time
+from typing import Dict, Iterable, List, NamedTuple, Set
+
+import psutil
+
+from models.constants import LOGGER
+from models.profiler import span
+
+PROCESSES: Dict[int, psutil.Process] = {}
+# Members of the process trees from the last check, which are kept in the cache along with the mapped processes
+MEMBERS: Set[int] = set()
+
+
+class Snapshot(NamedTuple):
+    """Point in time information of a process, collected in a single pass.
+
+    >>> Snapshot
+
+    """
+
+    pid: int
+    status: str
+    threads: int
+    fds: int
+    rss: int
+    cpu_time: float
+    cpu: float | None = None
+    open_files: int | None = None
+
+
+def get_process(pid: int) -> psutil.Process:
+    """Gets the process object for a PID, re-using the one from a previous check if the process is still the same.
+
+    Args:
+        pid: Process ID.
+
+    Raises:
+        psutil.Error:
+        Raises an error when the process doesn't exist or cannot be accessed.
+
+    Returns:
+        psutil.Process:
+        Returns the process object.
+    """
+    # is_running also compares the creation time, so a re-used PID is not mistaken for the cached process
+    if (process := PROCESSES.get(pid)) and process.is_running():
+        return process
+    process = psutil.Process(pid=pid)
+    process.sampled = False
+    PROCESSES[pid] = process
+    return process
+
+
+def read(
+    process: psutil.Process, performance: bool, open_files: bool = True
+) -> Snapshot:
+    """Reads all the information required for a process, using the cached syscalls from oneshot.
+
+    Args:
+        process: Process object.
+        performance: Boolean flag to read CPU utilization and open files.
+        open_files: Boolean flag to list the open files, which is expensive for processes with many file descriptors.
+
+    Returns:
+        Snapshot:
+        Returns the snapshot of the process.
+    """
+    with process.oneshot():
+        cpu_times = process.cpu_times()
+        snapshot = Snapshot(
+            pid=process.pid,
+            status=process.status(),
+            threads=process.num_threads(),
+            fds=process.num_fds() if psutil.POSIX else process.num_handles(),
+            rss=process.memory_info().rss,
+            cpu_time=cpu_times.user + cpu_times.system,
+        )
+        if not performance:
+            return snapshot
+        # cpu_percent re-uses the cpu_times cached by oneshot
+        cpu = process.cpu_percent(interval=None)
+    return snapshot._replace(
+        cpu=cpu if process.sampled else None,  # noqa
+        open_files=len(process.open_files()) if open_files else None,
+    )
+
+
+def collect(
+    pids: Iterable[int],
+    performance: bool = False,
+    interval: float = 0.5,
+    open_files: bool = True,
+    prime: bool = True,
+) -> Dict[int, Snapshot]:
+    """Collects the snapshot of all the processes in a single pass, without any threads.
+
+    Args:
+        pids: Process IDs to collect.
+        performance: Boolean flag to sample CPU utilization and open files.
+        interval: Seconds to wait, for processes that weren't sampled in a previous check.
+        open_files: Boolean flag to list the open files.
+        prime: Boolean flag to wait for the processes that weren't sampled, instead of reporting them in the next check.
+
+    Returns:
+        Dict[int, Snapshot]:
+        Returns a dictionary of PID and snapshot as key-value pair. PIDs that are invalid are left out.
+
+    Notes:
+        - CPU utilization is primed for all the processes at once, and read after a single shared interval.
+        - Processes that were sampled in a previous check (daemon mode) report the utilization since then without
+          waiting.
+        - Cached processes that are neither in this check nor in a process tree from the last check are dropped.
+    """
+    pids = list(pids)
+    for pid in set(PROCESSES).difference(pids, MEMBERS):
+        PROCESSES.pop(pid)
+    MEMBERS.clear()
+    snapshots: Dict[int, Snapshot] = {}
+    primed: List[psutil.Process] = []
+    for pid in pids:
+        try:
+            process = get_process(pid)
+            snapshots[pid] = read(process, performance, open_files)
+        except psutil.Error as error:
+            LOGGER.debug(error)
+            continue
+        if performance and not process.sampled:  # noqa
+            primed.append(process)
+    if not prime:
+        # Utilization since now is reported in the next check, without waiting in this one
+        for process in primed:
+            process.sampled = True
+        return snapshots
+    if primed:
+        with span("sample"):
+            time.sleep(interval)
+    for process in primed:
+        try:
+            cpu = process.cpu_percent(interval=None)
+        except psutil.Error as error:
+            LOGGER.debug(error)
+            snapshots.pop(process.pid, None)
+        else:
+            process.sampled = True
+            snapshots[process.pid] = snapshots[process.pid]._replace(cpu=cpu)
+    return snapshots
+
+
+class Tree(NamedTuple):
+    """Resource usage of a function, aggregated over the whole process tree.
+
+    >>> Tree
+
+    Notes:
+        Rates are per second since the previous check, and are only available for a long-running monitor.
+    """
+
+    processes: int
+    threads: int
+    fds: int
+    rss: int
+    uss: int | None = None
+    read_rate: float | None = None
+    write_rate: float | None = None
+    ctx_switches: float | None = None
+
+
+def get_children() -> Dict[int, List[int]]:
+    """Gets the children of all the processes, with a single scan of the process table.
+
+    Returns:
+        Dict[int, List[int]]:
+        Returns a dictionary of PID and the PIDs of its children as key-value pair.
+    """
+    children: Dict[int, List[int]] = {}
+    for process in psutil.process_iter(["ppid"]):
+        children.setdefault(process.info["ppid"], []).append(process.pid)
+    return children
+
+
+def walk(pid: int, children: Dict[int, List[int]]) -> List[int]:
+    """Walks the process tree starting from a PID.
+
+    Args:
+        pid: Process ID of the root.
+        children: Children of all the processes.
+
+    Returns:
+        List[int]:
+        Returns the PID of the root, followed by all of its descendants.
+    """
+    tree, stack = [], [pid]
+    while stack:
+        tree.append(pid := stack.pop())
+        stack.extend(children.get(pid, []))
+    return tree
+
+
+def read_counters(process: psutil.Process, uss: bool) -> Dict[str, int | float]:
+    """Reads the resource usage of a process, and the rates since its previous read.
+
+    Args:
+        process: Process object.
+        uss: Boolean flag to read the unique set size, which is expensive since it requires parsing the memory maps.
+
+    Returns:
+        Dict[str, int | float]:
+        Returns the resource usage as key-value pairs.
+    """
+    now = time.time()
+    with process.oneshot():
+        counters = {
+            "threads": process.num_threads(),
+            "fds": process.num_fds() if psutil.POSIX else process.num_handles(),
+        }
+        try:
+            memory = process.memory_full_info() if uss else process.memory_info()
+        except psutil.AccessDenied:
+            memory = process.memory_info()
+        counters["rss"] = memory.rss
+        if hasattr(memory, "uss"):
+            counters["uss"] = memory.uss
+        totals = {"ctx_switches": sum(process.num_ctx_switches())}
+        try:
+            io_counters = process.io_counters()
+        except (psutil.AccessDenied, AttributeError):  # not available in macOS
+            pass
+        else:
+            totals.update(
+                read_rate=io_counters.read_bytes, write_rate=io_counters.write_bytes
+            )
+    if previous := getattr(process, "totals", None):
+        elapsed = now - previous["time"]
+        for key, value in totals.items():
+            if key in previous:
+                counters[key] = (value - previous[key]) / elapsed
+    process.totals = {"time": now, **totals}
+    return counters
+
+
+def collect_trees(
+    functions: Dict[str, Iterable[int]], uss: Iterable[str] = ()
+) -> Dict[str, Tree]:
+    """Collects the resource usage of the process tree for each function, in a single pass.
+
+    Args:
+        functions: Function name and the PIDs of the function as key-value pair.
+        uss: Function names that require the unique set size.
+
+    Returns:
+        Dict[str, Tree]:
+        Returns a dictionary of function name and the aggregated usage as key-value pair.
+
+    Notes:
+        - Process table is scanned once to find the children of all the processes, instead of a scan for each process.
+        - Members of the trees are kept in the cache until the next check, so that their rates can be measured.
+    """
+    children = get_children()
+    uss = set(uss)
+    trees: Dict[str, Tree] = {}
+    for func_name, pids in functions.items():
+        # Set of PIDs, so that a process listed along with its parent isn't counted twice
+        members = {member for pid in pids for member in walk(pid, children)}
+        MEMBERS.update(members)
+        processes, aggregate = 0, {}
+        for pid in members:
+            try:
+                counters = read_counters(get_process(pid), func_name in uss)
+            except psutil.Error as error:
+                LOGGER.debug(error)
+                continue
+            processes += 1
+            for key, value in counters.items():
+                aggregate[key] = aggregate.get(key, 0) + value
+        if processes:
+            trees[func_name] = Tree(processes=processes, **aggregate)
+    return trees
@@ -0,0 +1,59 @@
+import json
+import os
+
+from models.constants import LOGGER
+
+
+def load(filepath: str) -> dict | list | None:
+    """Loads the state that was dumped into a JSON file.
+
+    Args:
+        filepath: Path of the state file.
+
+    Returns:
+        dict | list:
+        Returns the state, or None when the file is missing or corrupt.
+
+    Notes:
+        A corrupt file is moved aside instead of being overwritten by the next dump, so that it can be recovered.
+    """
+    try:
+        with open(filepath) as file:
+            return json.load(file)
+    except FileNotFoundError as error:
+        LOGGER.debug(error)
+    except json.JSONDecodeError as error:
+        LOGGER.critical(
+            "State file '%s' is corrupt, moving it to '%s.corrupt': %s",
+            filepath,
+            filepath,
+            error,
+        )
+        os.replace(filepath, f"{filepath}.corrupt")
+
+
+def write(filepath: str, content: str | bytes) -> None:
+    """Writes the content into a file, atomically.
+
+    Args:
+        filepath: Path of the file.
+        content: Content to write, as text or binary.
+    """
+    # Write to a temporary file and replace, so that a run that is killed never leaves a partial file
+    tmp_file = f"{filepath}.tmp"
+    with open(tmp_file, "wb" if isinstance(content, bytes) else "w") as file:
+        file.write(content)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_file, filepath)
+
+
+def dump(filepath: str, state: dict | list, indent: int = None) -> None:
+    """Dumps the state into a JSON file, atomically.
+
+    Args:
+        filepath: Path of the state file.
+        state: State to dump.
+        indent: Indentation for the JSON content.
+    """
+    write(filepath, json.dumps(state, indent=indent))
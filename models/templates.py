@@ -0,0 +1,83 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, Tuple
+
+import jinja2
+
+from models.constants import REPOSITORY, static
+
+
+class Environment(jinja2.Environment):
+    """Environment that records the templates extended or included while a template is rendered.
+
+    >>> Environment
+
+    """
+
+    # Templates referenced by the render in each thread, since the web page and the email may render concurrently
+    referenced = threading.local()
+
+    def get_template(
+        self,
+        name: str | jinja2.Template,
+        parent: str | None = None,
+        globals: Dict[str, Any] | None = None,
+    ) -> jinja2.Template:
+        """Loads a template, and records it when it is referenced by another template that is being rendered."""
+        template = super().get_template(name, parent, globals)
+        if (
+            parent is not None
+            and (referenced := getattr(self.referenced, "templates", None)) is not None
+        ):
+            referenced.append(template)
+        return template
+
+
+ENVIRONMENT = Environment(
+    loader=jinja2.FileSystemLoader(os.path.join(REPOSITORY, "templates")),
+    bytecode_cache=jinja2.FileSystemBytecodeCache(
+        directory=static.STATE_DIRECTORY, pattern="__jinja2_%s.cache"
+    ),
+    auto_reload=True,
+)
+RENDERED: Dict[str, Tuple[str, Tuple[jinja2.Template, ...], str]] = {}
+
+
+def render(template: str, **kwargs) -> str:
+    """Renders a template using the shared environment, skipping the render when the template and input haven't changed.
+
+    Args:
+        template: Name of the template in templates directory.
+        kwargs: Variables to render the template with.
+
+    Returns:
+        str:
+        Returns the rendered content.
+
+    Notes:
+        Environment re-loads a template when its source file has changed, so a different template object
+        invalidates the rendered content as well. A change in the templates it extends invalidates the content
+        the same way, since they are no longer up-to-date. Those templates are recorded as they are loaded during
+        the render, so the source is never parsed again to find them.
+    """
+    key = hashlib.md5(
+        json.dumps(kwargs, sort_keys=True, default=str).encode()
+    ).hexdigest()
+    compiled = ENVIRONMENT.get_template(template)
+    if (
+        (cached := RENDERED.get(template))
+        and cached[0] == key
+        and cached[1][0] is compiled
+        and all(parent.is_up_to_date for parent in cached[1][1:])
+    ):
+        return cached[2]
+    ENVIRONMENT.referenced.templates = []
+    try:
+        content = compiled.render(**kwargs)
+        parents = tuple(ENVIRONMENT.referenced.templates)
+    finally:
+        ENVIRONMENT.referenced.templates = None
+    RENDERED[template] = (key, (compiled, *parents), content)
+    return content
@@ -0,0 +1,194 @@
+import argparse
+import bisect
+import csv
+import mmap
+import os
+import struct
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, List, NamedTuple
+
+from models.constants import LOGGER, env, static
+
+# timestamp, function, pid, status, cpu, rss, threads, fds
+RECORD = struct.Struct("<d32sIBfQII")
+STATUS_CODES = {"green": 0, "yellow": 1, "red": 2, "blue": 3}
+FILENAME = "%Y-%m-%d.bin"
+
+
+class Sample(NamedTuple):
+    """Metrics of a process at a point in time, stored as a fixed size record.
+
+    >>> Sample
+
+    """
+
+    timestamp: float
+    function: str
+    pid: int
+    status: int
+    cpu: float
+    rss: int
+    threads: int
+    fds: int
+
+
+def get_filepath(date: datetime) -> str:
+    """Gets the filepath of the store for a particular day.
+
+    Args:
+        date: Datetime object for the day.
+
+    Returns:
+        str:
+        Returns the filepath of the store.
+    """
+    return date.strftime(os.path.join(static.METRICS_DIRECTORY, FILENAME))
+
+
+def cleanup() -> None:
+    """Deletes previous days' store as per the metrics retention period."""
+    retain = {
+        (datetime.now() - timedelta(days=i)).strftime(FILENAME)
+        for i in range(env.metrics_retention)
+    }
+    for file in os.listdir(static.METRICS_DIRECTORY):
+        if file not in retain:
+            LOGGER.debug("Deleting expired metrics: %s", file)
+            os.remove(os.path.join(static.METRICS_DIRECTORY, file))
+
+
+def encode(function: str) -> bytes:
+    """Encodes the function name to fit the record, truncating on a character boundary.
+
+    Args:
+        function: Function name.
+
+    Returns:
+        bytes:
+        Returns the encoded function name, that is at most 32 bytes.
+    """
+    # Partial character at the end of the truncated bytes is dropped, so that the name can always be decoded
+    return function.encode()[:32].decode(errors="ignore").encode()
+
+
+def append(samples: Iterable[Sample]) -> None:
+    """Appends the samples to the store for the current day, with a single write.
+
+    Args:
+        samples: Samples to append.
+    """
+    os.makedirs(static.METRICS_DIRECTORY, exist_ok=True)
+    filepath = get_filepath(datetime.now())
+    # Expired stores are looked up only when the day rolls over, instead of every check
+    new_day = not os.path.isfile(filepath)
+    with open(filepath, "ab") as file:
+        file.write(
+            b"".join(
+                RECORD.pack(
+                    sample.timestamp,
+                    encode(sample.function),
+                    sample.pid,
+                    sample.status,
+                    sample.cpu,
+                    sample.rss,
+                    sample.threads,
+                    sample.fds,
+                )
+                for sample in samples
+            )
+        )
+        file.flush()
+    if new_day:
+        cleanup()
+
+
+def unpack(buffer: mmap.mmap, index: int) -> Sample:
+    """Unpacks the record at an index from the buffer.
+
+    Args:
+        buffer: Memory mapped store.
+        index: Index of the record.
+
+    Returns:
+        Sample:
+        Returns the sample.
+    """
+    timestamp, function, *values = RECORD.unpack_from(buffer, index * RECORD.size)
+    # Records written before the names were truncated on a character boundary may end with a partial character
+    return Sample(timestamp, function.rstrip(b"\0").decode(errors="ignore"), *values)
+
+
+class Timestamps:
+    """Sequence view of the timestamps in a memory mapped store, for a binary search without reading all the records.
+
+    >>> Timestamps
+
+    """
+
+    def __init__(self, buffer: mmap.mmap):
+        """Instantiates the view with the memory mapped store."""
+        self.buffer = buffer
+
+    def __len__(self) -> int:
+        """Number of records in the store."""
+        return len(self.buffer) // RECORD.size
+
+    def __getitem__(self, index: int) -> float:
+        """Timestamp of the record at an index."""
+        return struct.unpack_from("<d", self.buffer, index * RECORD.size)[0]
+
+
+def query(start: float, end: float, function: str = None) -> Iterator[Sample]:
+    """Queries the samples within a time range.
+
+    Args:
+        start: Epoch time to start from (inclusive).
+        end: Epoch time to end at (exclusive).
+        function: Function name to filter the samples.
+
+    Yields:
+        Sample:
+        Yields the samples in the order they were stored.
+    """
+    if function is not None:
+        # Names are stored truncated, so the filter is truncated the same way
+        function = encode(function).decode()
+    day = datetime.fromtimestamp(start).replace(hour=0, minute=0, second=0)
+    days: List[str] = []
+    while day.timestamp() < end:
+        days.append(get_filepath(day))
+        day += timedelta(days=1)
+    for filepath in days:
+        if not os.path.isfile(filepath) or not os.path.getsize(filepath):
+            continue
+        with open(filepath, "rb") as file, mmap.mmap(
+            file.fileno(), 0, access=mmap.ACCESS_READ
+        ) as buffer:
+            timestamps = Timestamps(buffer)
+            for index in range(
+                bisect.bisect_left(timestamps, start),
+                bisect.bisect_left(timestamps, end),
+            ):
+                sample = unpack(buffer, index)
+                if function is None or sample.function == function:
+                    yield sample
+
+
+def main() -> None:
+    """Exports the samples within a time range as CSV, to the standard output."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument(
+        "--hours", type=float, default=1, help="Number of hours to look back."
+    )
+    parser.add_argument("--function", help="Function name to filter the samples.")
+    args = parser.parse_args()
+    end = time.time()
+    writer = csv.writer(sys.stdout)
+    writer.writerow(Sample._fields)
+    writer.writerows(query(end - args.hours * 3_600, end, args.function))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import time
+from typing import Dict, List
+
+from models import storage
+from models.constants import color_codes, static
+
+# Window name and the number of hourly buckets in it
+WINDOWS = {"24h": 24, "7d": 168, "30d": 720}
+RETENTION = max(WINDOWS.values())
+
+
+def load_state() -> Dict[str, dict]:
+    """Loads the rolling counters for all the processes."""
+    return storage.load(static.UPTIME_STATE) or {}
+
+
+def dump_state(state: Dict[str, dict]) -> None:
+    """Dumps the rolling counters for all the processes."""
+    storage.dump(static.UPTIME_STATE, state)
+
+
+def new_counter(hour: int) -> dict:
+    """Creates the rolling counters for a process that is seen for the first time.
+
+    Args:
+        hour: Current hour since epoch.
+
+    Returns:
+        dict:
+        Returns the counters with empty buckets, sums and incidents.
+    """
+    return {
+        "buckets": {},
+        "sums": {window: [0, 0] for window in WINDOWS},
+        "cursors": {window: hour for window in WINDOWS},
+        "incidents": [],
+    }
+
+
+def roll(counter: dict, hour: int) -> None:
+    """Evicts the hourly buckets that fell out of each window, from the running sums.
+
+    Args:
+        counter: Rolling counters of a process.
+        hour: Current hour since epoch.
+
+    Notes:
+        Each bucket is evicted only once per window, so the cost is constant per check regardless of the history.
+    """
+    for window, size in WINDOWS.items():
+        cursor, sums = counter["cursors"][window], counter["sums"][window]
+        oldest = hour - size + 1
+        # Skip straight ahead when the monitor was down for longer than the window
+        if oldest - cursor > size:
+            counter["sums"][window] = [0, 0]
+            cursor = oldest
+        while cursor < oldest:
+            if bucket := counter["buckets"].get(str(cursor)):
+                sums[0] -= bucket[0]
+                sums[1] -= bucket[1]
+            cursor += 1
+        counter["cursors"][window] = cursor
+    for key in [key for key in counter["buckets"] if int(key) <= hour - RETENTION]:
+        del counter["buckets"][key]
+    expiry = (hour - RETENTION + 1) * 3_600
+    counter["incidents"] = [
+        incident
+        for incident in counter["incidents"]
+        if incident[1] is None or incident[1] >= expiry
+    ]
+
+
+def summarize(counter: dict, now: float) -> Dict[str, dict]:
+    """Summarizes the uptime, incident count and mean time to recovery for each window.
+
+    Args:
+        counter: Rolling counters of a process.
+        now: Current epoch time.
+
+    Returns:
+        Dict[str, dict]:
+        Returns the summary for each window.
+    """
+    summary = {}
+    for window, size in WINDOWS.items():
+        up, total = counter["sums"][window]
+        start = now - size * 3_600
+        incidents: List[List[float | None]] = [
+            incident
+            for incident in counter["incidents"]
+            if incident[1] is None or incident[1] >= start
+        ]
+        recoveries = [end - begin for begin, end in incidents if end is not None]
+        summary[window] = {
+            "uptime": round(up / total * 100, 2) if total else None,
+            "incidents": len(incidents),
+            "mttr": round(sum(recoveries) / len(recoveries)) if recoveries else None,
+        }
+    return summary
+
+
+def update(status: dict) -> Dict[str, Dict[str, dict]]:
+    """Updates the rolling counters with the current status, and returns the summary for all the processes.
+
+    Args:
+        status: Translated status dictionary.
+
+    Returns:
+        Dict[str, Dict[str, dict]]:
+        Returns the summary for each window, for all the processes.
+    """
+    now = time.time()
+    hour = int(now // 3_600)
+    state = load_state()
+    summary = {}
+    for name, (color, _) in status.items():
+        counter = state.setdefault(name, new_counter(hour))
+        roll(counter, hour)
+        if color == color_codes.blue:  # maintenance is not counted against the uptime
+            continue
+        up = color != color_codes.red
+        bucket = counter["buckets"].setdefault(str(hour), [0, 0])
+        bucket[0] += up
+        bucket[1] += 1
+        for sums in counter["sums"].values():
+            sums[0] += up
+            sums[1] += 1
+        incidents = counter["incidents"]
+        ongoing = incidents and incidents[-1][1] is None
+        if not up and not ongoing:
+            incidents.append([now, None])
+        elif up and ongoing:
+            incidents[-1][1] = now
+        summary[name] = summarize(counter, now)
+    dump_state(state)
+    storage.dump(static.UPTIME_FILE, {"timestamp": now, "processes": summary}, indent=2)
+    return summary
+
+
+def get_uptime() -> str:
+    """Gets the content of the uptime summary, to be published along with the index file."""
+    try:
+        with open(static.UPTIME_FILE) as file:
+            return file.read()
+    except FileNotFoundError:
+        return ""
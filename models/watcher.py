@@ -0,0 +1,223 @@
+import ctypes
+import ctypes.util
+import os
+import selectors
+import struct
+import time
+from typing import Dict, Iterable, Set
+
+import psutil
+
+from models.constants import LOGGER, env
+
+# inotify flags from sys/inotify.h
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_EVENT = struct.Struct("iIII")
+
+
+def inotify_init(directory: str) -> int | None:
+    """Initiates an inotify instance to watch a directory, using libc since there is no binding in standard library.
+
+    Args:
+        directory: Directory to watch.
+
+    Returns:
+        int:
+        Returns the file descriptor for the inotify instance, if available.
+    """
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        inotify_fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError) as error:
+        LOGGER.debug(error)
+        return
+    if inotify_fd < 0:
+        LOGGER.warning(os.strerror(ctypes.get_errno()))
+        return
+    mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    if libc.inotify_add_watch(inotify_fd, directory.encode(), mask) < 0:
+        LOGGER.warning(os.strerror(ctypes.get_errno()))
+        os.close(inotify_fd)
+        return
+    return inotify_fd
+
+
+class Watcher:
+    """Watches the processes in the source map and the source map itself, to detect changes without polling.
+
+    >>> Watcher
+
+    Notes:
+        - Processes are watched with a pidfd, which becomes readable as soon as the process exits.
+        - Source map is watched with inotify on its directory, since Jarvis may replace the file instead of writing it.
+        - Without pidfd, processes are waited on in short slices, checking the source map between each slice.
+        - Without inotify, the source map is checked by comparing the file's stat.
+    """
+
+    def __init__(self):
+        """Instantiates the selector and the inotify instance for the directory of the source map."""
+        self.selector = selectors.DefaultSelector()
+        self.pidfds: Dict[int, int] = {}
+        self.exited: Set[int] = set()
+        self.processes: Dict[int, psutil.Process] = {}
+        self.filename = os.path.basename(env.source_map)
+        self.source_stat = self.stat()
+        self.inotify_fd = inotify_init(os.path.dirname(os.path.abspath(env.source_map)))
+        if self.inotify_fd is not None:
+            self.selector.register(self.inotify_fd, selectors.EVENT_READ, "source_map")
+        self.pidfd = hasattr(os, "pidfd_open")
+
+    def stat(self) -> tuple | None:
+        """Gets the key to detect changes in the source map, when inotify is unavailable."""
+        try:
+            stat = os.stat(env.source_map)
+        except FileNotFoundError:
+            return
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def watch(self, pids: Iterable[int]) -> None:
+        """Updates the processes being watched, to match the ones in the source map.
+
+        Args:
+            pids: Process IDs in the source map.
+        """
+        pids = set(pids)
+        # Processes that already exited are not watched again, until they are removed from the source map
+        self.exited &= pids
+        for pid in set(self.pidfds).difference(pids):
+            self.unwatch(pid)
+        for pid in set(self.processes).difference(pids):
+            self.processes.pop(pid)
+        for pid in pids.difference(self.pidfds, self.processes, self.exited):
+            if self.pidfd:
+                try:
+                    self.pidfds[pid] = os.pidfd_open(pid)
+                except ProcessLookupError as error:
+                    LOGGER.debug(error)
+                    self.exited.add(pid)
+                    continue
+                except OSError as error:
+                    # ENOSYS on kernels older than 5.3, or EPERM when blocked by a seccomp profile
+                    LOGGER.warning(
+                        "pidfd is unavailable, falling back to waiting on the processes: %s",
+                        error,
+                    )
+                    self.fallback()
+                else:
+                    self.selector.register(self.pidfds[pid], selectors.EVENT_READ, pid)
+                    continue
+            try:
+                self.processes[pid] = psutil.Process(pid)
+            except psutil.Error as error:
+                LOGGER.debug(error)
+                self.exited.add(pid)
+
+    def fallback(self) -> None:
+        """Stops using pidfd, and moves the processes that are already watched to wait on them instead."""
+        self.pidfd = False
+        for pid in list(self.pidfds):
+            self.unwatch(pid)
+            try:
+                self.processes[pid] = psutil.Process(pid)
+            except psutil.Error as error:
+                LOGGER.debug(error)
+                self.exited.add(pid)
+
+    def unwatch(self, pid: int) -> None:
+        """Stops watching a process.
+
+        Args:
+            pid: Process ID.
+        """
+        pidfd = self.pidfds.pop(pid)
+        self.selector.unregister(pidfd)
+        os.close(pidfd)
+
+    def read_inotify(self) -> bool:
+        """Reads all the pending inotify events, and returns a boolean flag to indicate if the source map changed."""
+        changed = False
+        while True:
+            try:
+                buffer = os.read(self.inotify_fd, 4096)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(buffer):
+                _, _, _, length = IN_EVENT.unpack_from(buffer, offset)
+                start, offset = offset + IN_EVENT.size, offset + IN_EVENT.size + length
+                name = buffer[start:offset].rstrip(b"\0").decode()
+                changed |= name == self.filename
+
+    def select(self, timeout: float) -> bool:
+        """Waits for the registered file descriptors, and returns a boolean flag to indicate if there was an event.
+
+        Args:
+            timeout: Seconds to wait.
+        """
+        triggered = False
+        for key, _ in self.selector.select(timeout=max(timeout, 0)):
+            if key.data == "source_map":
+                if self.read_inotify():
+                    LOGGER.info("Source map has been modified")
+                    triggered = True
+            else:
+                LOGGER.critical("Process [%d] has exited", key.data)
+                self.unwatch(key.data)
+                self.exited.add(key.data)
+                triggered = True
+        return triggered
+
+    def poll(self, timeout: float) -> bool:
+        """Waits on the processes as a fallback, and returns a boolean flag to indicate if there was an event.
+
+        Args:
+            timeout: Seconds to wait.
+        """
+        if self.processes:
+            gone, _ = psutil.wait_procs(
+                list(self.processes.values()), timeout=max(timeout, 0)
+            )
+        else:
+            gone = []
+            time.sleep(max(timeout, 0))
+        for process in gone:
+            LOGGER.critical("Process [%d] has exited", process.pid)
+            self.processes.pop(process.pid)
+            self.exited.add(process.pid)
+        return bool(gone)
+
+    def wait(self, timeout: float, debounce: float = 0.5) -> bool:
+        """Waits until a watched process exits, the source map changes or the timeout expires.
+
+        Args:
+            timeout: Seconds to wait.
+            debounce: Seconds to collect related events, like Jarvis restarting and re-writing the source map.
+
+        Returns:
+            bool:
+            Returns a boolean flag to indicate if the wait was interrupted by an event.
+        """
+        deadline = time.time() + timeout
+        while (remaining := deadline - time.time()) > 0:
+            if self.inotify_fd is None or not self.pidfd:
+                # Short waits so that the source map can be checked between each wait on the processes
+                remaining = min(remaining, 1)
+            if self.pidfd:
+                triggered = self.select(remaining)
+            else:
+                triggered = self.poll(remaining)
+                if self.inotify_fd is not None:
+                    triggered |= self.select(0)
+            if self.inotify_fd is None and (stat := self.stat()) != self.source_stat:
+                LOGGER.info("Source map has been modified")
+                self.source_stat = stat
+                triggered = True
+            if triggered:
+                time.sleep(debounce)
+                if self.pidfd or self.inotify_fd is not None:
+                    self.select(0)
+                return True
+        return False
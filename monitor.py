@@ -1,38 +1,178 @@
+import json
+import math
 import os
+import pickle
 import string
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
 from datetime import datetime
-from threading import Thread
-from typing import Dict, List
+from typing import Dict, List, NamedTuple, Tuple
 
-import jinja2
 import psutil
 import yaml
 
+from models import (
+    baseline,
+    collector,
+    exporter,
+    governor,
+    probes,
+    storage,
+    timeseries,
+    uptime,
+)
 from models.conditions import all_pids_are_red, main_process_is_red, some_pids_are_red
 from models.constants import LOGGER, color_codes, env, static
-from models.helper import check_performance, send_email
+from models.helper import check_performance, check_thresholds
+from models.history import COLORS
+from models.profiler import span
+from models.snapshot import Snapshot, Tree, collect, collect_trees
+from models.templates import render
 
-STATUS_DICT = {}
+SOURCE_MAP = {}
+# Key in the mapping of a function, to set the thresholds for its process tree
+THRESHOLDS = "thresholds"
+# Key in the mapping of a function, to set the active probes for its endpoints
+PROBES = "probes"
+# Order of the colors by severity, to merge the results of a function that is reported by more than one host
+SEVERITY = {"green": 0, "yellow": 1, "red": 2}
+# Version of the schema for status.json, to be incremented when a change is not backwards compatible
+STATUS_VERSION = 1
+# libyaml's loader is a lot faster, but is only available when PyYAML is built against it
+LOADER = getattr(yaml, "CFullLoader", yaml.FullLoader)
+
+
+def load_sidecar(key: Tuple[int, int, int]) -> Dict[str, Dict[int, List[str]]] | None:
+    """Loads the pre-parsed processes mapping from the binary sidecar, if it was generated for the same source file.
+
+    Args:
+        key: Inode, modified time and size of the source file.
+
+    Returns:
+        Dict[str, Dict[int, List[str]]]:
+        Returns the processes mapping.
+    """
+    try:
+        with open(static.SOURCE_CACHE, "rb") as file:
+            cached_key, data = pickle.load(file)
+    except (FileNotFoundError, pickle.UnpicklingError, EOFError, ValueError) as error:
+        LOGGER.debug(error)
+        return
+    if tuple(cached_key) == key:
+        return data
+
+
+def dump_sidecar(key: Tuple[int, int, int], data: Dict[str, Dict[int, List[str]]]):
+    """Dumps the processes mapping into the binary sidecar, along with the key of the source file it was parsed from.
+
+    Args:
+        key: Inode, modified time and size of the source file.
+        data: Processes mapping.
+    """
+    # Written atomically, so a concurrent reader never sees a partial sidecar
+    storage.write(
+        static.SOURCE_CACHE,
+        pickle.dumps((key, data), protocol=pickle.HIGHEST_PROTOCOL),
+    )
+
+
+def parse(
+    source: Dict[str, Dict[int | str, List[str] | dict]]
+) -> Tuple[
+    Dict[str, Dict[int, List[str]]],
+    Dict[str, Dict[str, float]],
+    Dict[str, List[probes.Probe]],
+]:
+    """Separates the processes from the options in the source map.
+
+    Args:
+        source: Source map, which may have thresholds and probes along with the PIDs of a function.
+
+    Returns:
+        Tuple[Dict[str, Dict[int, List[str]]], Dict[str, Dict[str, float]], Dict[str, List[probes.Probe]]]:
+        Returns the processes mapping, the thresholds and the probes for each function.
+    """
+    data, thresholds, func_probes = {}, {}, {}
+    for func_name, proc_info in source.items():
+        data[func_name] = {
+            pid: impact for pid, impact in proc_info.items() if isinstance(pid, int)
+        }
+        if (options := proc_info.get(THRESHOLDS)) and not isinstance(options, dict):
+            LOGGER.warning("Invalid thresholds for '%s': %s", func_name, options)
+        elif options:
+            if unknown := set(options).difference(Tree._fields):
+                LOGGER.warning("Unknown thresholds for '%s': %s", func_name, unknown)
+            if invalid := {
+                key: value
+                for key, value in options.items()
+                if isinstance(value, bool) or not isinstance(value, (int, float))
+            }:
+                LOGGER.warning("Invalid thresholds for '%s': %s", func_name, invalid)
+            thresholds[func_name] = {
+                key: value
+                for key, value in options.items()
+                if key in Tree._fields and key not in invalid
+            }
+        if (definitions := proc_info.get(PROBES)) and (
+            parsed := probes.parse(func_name, definitions)
+        ):
+            func_probes[func_name] = parsed
+    return data, thresholds, func_probes
 
 
 def get_data() -> Dict[str, Dict[int, List[str]]] | None:
-    """Get processes mapping from Jarvis."""
+    """Get processes mapping from Jarvis.
+
+    Notes:
+        The parsed mapping is cached against the inode, modified time and size of the source file,
+        so the file is parsed only when Jarvis re-writes it. Thresholds and probes from the source map are cached
+        alongside.
+    """
     try:
-        with open(env.source_map) as file:
-            return yaml.load(stream=file, Loader=yaml.FullLoader)
+        stat = os.stat(env.source_map)
     except FileNotFoundError:
+        SOURCE_MAP.clear()
         LOGGER.warning("Feed file is missing, assuming maintenance mode.")
+        return
+    key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    if SOURCE_MAP.get("key") == key:
+        return SOURCE_MAP["data"]
+    if not (env.source_cache and (data := load_sidecar(key))):
+        try:
+            with open(env.source_map) as file:
+                data = yaml.load(stream=file, Loader=LOADER)
+        except FileNotFoundError:
+            SOURCE_MAP.clear()
+            LOGGER.warning("Feed file is missing, assuming maintenance mode.")
+            return
+        if env.source_cache and data:
+            dump_sidecar(key, data)
+    data, thresholds, func_probes = parse(data) if data else (data, {}, {})
+    SOURCE_MAP.update(key=key, data=data, thresholds=thresholds, probes=func_probes)
+    return data
 
 
-def publish_docs(status: dict = None) -> None:
-    """Updates the docs/index.html file.
+def dump_status(status: dict) -> None:
+    """Dumps the status into the docs/status.json file, that is rendered by the HTML shell in the browser.
+
+    Args:
+        status: Status of all the processes, along with the state of the service.
+    """
+    storage.write(static.STATUS_JSON, json.dumps(status, separators=(",", ":")))
+
+
+def publish_docs(status: dict = None, uptime_summary: dict = None) -> dict:
+    """Updates the docs/index.html file, along with docs/status.json when the page is rendered client-side.
 
     Args:
         status: Translated status dictionary.
+        uptime_summary: Uptime, incidents and mean time to recovery for each process.
+
+    Returns:
+        dict:
+        Returns the status that was published.
     """
     LOGGER.info("Updating index.html")
-    t_desc, l_desc = "", ""
+    t_desc, l_desc, impacted = "", "", []
     if not status:  # process map is missing
         status = {"Jarvis": [color_codes.blue, ["Maintenance"]]}
         stat_file = "maintenance.png"
@@ -51,11 +191,13 @@ def publish_docs(status: dict = None) -> None:
         stat_text = "Some components are degraded"
         for key in status.keys():
             if status[key][0] == color_codes.red:
-                l_desc += (
-                    f"<b>Impacted by {key.lower()}:</b><br>"
-                    f"<br>&nbsp;&nbsp;&nbsp;&nbsp;{status[key][1][0]}"
-                    f"<ul><li>{'</li><li>'.join(status[key][1][1:])}</li></ul>"
-                )
+                impacted.append(key)
+                l_desc += f"<b>Impacted by {key.lower()}:</b><br>"
+                if impact := status[key][1]:
+                    l_desc += (
+                        f"<br>&nbsp;&nbsp;&nbsp;&nbsp;{impact[0]}"
+                        f"<ul><li>{'</li><li>'.join(impact[1:])}</li></ul>"
+                    )
     else:  # all green
         stat_text = "Jarvis is up and running"
         stat_file = "ok.png"
@@ -64,112 +206,353 @@ def publish_docs(status: dict = None) -> None:
                 "<b>Description:</b> Jarvis is running in limited mode. "
                 "All offline communicators and home automations are currently unavailable."
             )
-    with open(static.WEB_TEMPLATE) as web_temp:
-        template_data = web_temp.read()
-    template = jinja2.Template(template_data)
-    content = template.render(
-        result=status,
-        STATUS_FILE=stat_file,
-        STATUS_TEXT=stat_text,
-        TEXT_DESCRIPTION=t_desc,
-        LIST_DESCRIPTION=l_desc,
-        TIMEZONE=static.TIMEZONE,
-    )
+    if (tier := governor.get_tier()) != governor.FULL:
+        t_desc += f"<br><i>Monitor is running {governor.TIERS[tier]} checks, to limit its overhead on the host.</i>"
+    if env.client_render:
+        dump_status(
+            {
+                "version": STATUS_VERSION,
+                "generated": round(time.time()),
+                "timezone": static.TIMEZONE,
+                "state": {
+                    "image": stat_file,
+                    "text": stat_text,
+                    "description": t_desc,
+                    "impacted": impacted,
+                },
+                "processes": [
+                    {"name": key, "color": COLORS[value[0]], "impact": value[1]}
+                    for key, value in status.items()
+                ],
+                "uptime": uptime_summary,
+            }
+        )
+        # Shell has no variables, so the render is memoized until the template file is modified
+        content = render(static.SHELL_TEMPLATE)
+    else:
+        content = render(
+            static.WEB_TEMPLATE,
+            result=status,
+            STATUS_FILE=stat_file,
+            STATUS_TEXT=stat_text,
+            TEXT_DESCRIPTION=t_desc,
+            LIST_DESCRIPTION=l_desc,
+            TIMEZONE=static.TIMEZONE,
+            uptime=uptime_summary,
+        )
     with open(static.INDEX_FILE, "w") as file:
         file.write(content)
         file.flush()
+    return status
 
 
-def classify_processes(process: psutil.Process, proc_impact: List[str]) -> None:
+class Result(NamedTuple):
+    """Health of a function, as classified from its processes.
+
+    >>> Result
+
+    """
+
+    color: str
+    impact: Tuple[str, ...]
+    notify: bool = False
+
+
+def classify_processes(
+    func_name: str, snapshot: Snapshot, proc_impact: List[str], position: int
+) -> Result:
     """Classify all processes into good (green - all ok), bad (yellow - degraded performance) and evil (red - bad PID).
 
     Args:
-        process: Process object.
+        func_name: Function name.
+        snapshot: Snapshot of the process.
         proc_impact: Impact because of the process.
+        position: Position of the process in the mapping of the function.
 
-    Raises:
-        Exception:
-        Raises a bare exception to notify the worker, that the thread has failed.
+    Returns:
+        Result:
+        Returns the result of the classification, with the notify flag set for processes that are not healthy.
     """
-    func_name = process.func  # noqa
-    if psutil.pid_exists(process.pid) and process.status() == psutil.STATUS_RUNNING:
-        if env.check_performance and (issue := check_performance(process=process)):
-            LOGGER.info("%s [%d] is INTENSE", func_name, process.pid)
+    if snapshot.status == psutil.STATUS_RUNNING:
+        if env.check_performance and (
+            issue := check_performance(
+                name=func_name, snapshot=snapshot, position=position
+            )
+        ):
+            LOGGER.info("%s [%d] is INTENSE", func_name, snapshot.pid)
             # combine list of string with list of tuples
-            proc_impact.append(
-                "\n\n" + ", ".join(f"{key}: {value}" for key, value in issue.items())
+            return Result(
+                color_codes.yellow,
+                (
+                    *proc_impact,
+                    "\n\n"
+                    + ", ".join(f"{key}: {value}" for key, value in issue.items()),
+                ),
             )
-            STATUS_DICT[func_name] = [color_codes.yellow, proc_impact]
-        else:
-            LOGGER.info("%s [%d] is HEALTHY", func_name, process.pid)
-            STATUS_DICT[func_name] = [color_codes.green, proc_impact]
-    else:
-        LOGGER.critical("%s [%d] is NOT HEALTHY", func_name, process.pid)
-        STATUS_DICT[func_name] = [color_codes.red, proc_impact]
-        raise Exception  # Only to indicate, notify flag has to be flipped
+        LOGGER.info("%s [%d] is HEALTHY", func_name, snapshot.pid)
+        return Result(color_codes.green, tuple(proc_impact))
+    LOGGER.critical("%s [%d] is NOT HEALTHY", func_name, snapshot.pid)
+    return Result(color_codes.red, tuple(proc_impact), notify=True)
 
 
-def extract_proc_info(func_name: str, proc_info: Dict[int, List[str]]):
+def extract_proc_info(
+    func_name: str, proc_info: Dict[int, List[str]], snapshots: Dict[int, Snapshot]
+) -> Result | None:
     """Validates the process ID and calls the classifier function.
 
     Args:
         func_name: Function name.
         proc_info: Process information as a dictionary.
+        snapshots: Snapshots of all the processes, collected in a single pass.
 
-    Raises:
-        Exception:
-        Raises a bare exception to notify the worker, that the thread has failed.
+    Returns:
+        Result:
+        Returns the result of the last process that was classified, or the first one that was invalid or unhealthy.
     """
-    for pid, impact in proc_info.items():
-        try:
-            process = psutil.Process(pid=pid)
-        except psutil.Error as error:
-            LOGGER.error(error)
+    result = None
+    for position, (pid, impact) in enumerate(proc_info.items()):
+        if not (snapshot := snapshots.get(pid)):
             LOGGER.warning("%s [%d] is invalid.", func_name, pid)
-            raise Exception  # Only to indicate, notify flag
-        else:
-            process.func = func_name
-        classify_processes(process, sorted(impact, key=len))
+            return Result(
+                color_codes.red, ("INVALID PROCESS ID\n", *impact), notify=True
+            )
+        result = classify_processes(
+            func_name, snapshot, sorted(impact, key=len), position
+        )
+        if result.notify:
+            return result
+    return result
 
 
-def main() -> None:
-    """Checks the health of all processes in the mapping and actions accordingly."""
+def classify_tree(
+    func_name: str, result: Result, tree: Tree, thresholds: Dict[str, float]
+) -> Result:
+    """Downgrades the result of a function to degraded (yellow), when its process tree breaches the thresholds.
+
+    Args:
+        func_name: Function name.
+        result: Result of the classification.
+        tree: Resource usage aggregated over the process tree.
+        thresholds: Metric name and the upper limit as key-value pair.
+
+    Returns:
+        Result:
+        Returns the result of the classification.
+    """
+    if result.notify or not (
+        issue := check_thresholds(name=func_name, tree=tree, thresholds=thresholds)
+    ):
+        return result
+    return Result(
+        color_codes.yellow,
+        (
+            *result.impact,
+            "\n\n" + ", ".join(f"{key}: {value}" for key, value in issue.items()),
+        ),
+    )
+
+
+def classify_probes(
+    func_name: str, result: Result, outcomes: List[probes.Outcome]
+) -> Result:
+    """Downgrades the result of a function to bad (red) when a probe fails, or degraded (yellow) when it is slow.
+
+    Args:
+        func_name: Function name.
+        result: Result of the classification.
+        outcomes: Outcome of each probe.
+
+    Returns:
+        Result:
+        Returns the result of the classification.
+    """
+    if result.notify:
+        return result
+    failed, slow = probes.check(name=func_name, outcomes=outcomes)
+    if failed:
+        return Result(
+            color_codes.red,
+            ("PROBE FAILED\n", *result.impact, "\n\n" + ", ".join(failed)),
+            notify=True,
+        )
+    if slow:
+        return Result(color_codes.yellow, (*result.impact, "\n\n" + ", ".join(slow)))
+    return result
+
+
+def store_metrics(
+    data: Dict[str, Dict[int, List[str]]],
+    snapshots: Dict[int, Snapshot],
+    results: Dict[str, Result],
+) -> None:
+    """Stores the metrics of all the processes in the time-series store.
+
+    Args:
+        data: Processes mapping.
+        snapshots: Snapshots of all the processes, collected in a single pass.
+        results: Result of each function from the current check.
+    """
+    now = time.time()
+    samples = []
+    for func_name, proc_info in data.items():
+        color = COLORS[results[func_name].color] if func_name in results else "red"
+        for pid in proc_info:
+            if snapshot := snapshots.get(pid):
+                samples.append(
+                    timeseries.Sample(
+                        timestamp=now,
+                        function=func_name,
+                        pid=pid,
+                        status=timeseries.STATUS_CODES[color],
+                        cpu=math.nan if snapshot.cpu is None else snapshot.cpu,
+                        rss=snapshot.rss,
+                        threads=snapshot.threads,
+                        fds=snapshot.fds,
+                    )
+                )
+            else:
+                samples.append(
+                    timeseries.Sample(
+                        now,
+                        func_name,
+                        pid,
+                        timeseries.STATUS_CODES["red"],
+                        math.nan,
+                        0,
+                        0,
+                        0,
+                    )
+                )
+    timeseries.append(samples)
+
+
+def evaluate() -> Dict[str, Result] | None:
+    """Checks the health of all processes in the mapping of this host.
+
+    Returns:
+        Dict[str, Result]:
+        Returns the result of each function, or None if the mapping is missing.
+    """
+    with span("load"):
+        data = get_data()
+    if not data:
+        if env.metrics_port:
+            exporter.record({}, {}, {}, {})
+        return
+    results: Dict[str, Result] = {}
+    tier = governor.get_tier()
+    with span("classify"):
+        # Probes wait on the network, so they run in the background while the processes are inspected
+        started = time.perf_counter()
+        pending = probes.submit(SOURCE_MAP.get("probes", {}))
+        snapshots = collect(
+            pids=(pid for proc_info in data.values() for pid in proc_info),
+            performance=env.check_performance and tier < governor.MINIMAL,
+            open_files=tier == governor.FULL,
+            # Processes are new on every run in cron mode, so there is no previous check to sample CPU from
+            prime=tier == governor.FULL or not env.daemon,
+        )
+        thresholds = SOURCE_MAP.get("thresholds", {}) if tier < governor.MINIMAL else {}
+        trees = (
+            collect_trees(
+                functions={key: data[key] for key in thresholds},
+                uss=(
+                    key
+                    for key, value in thresholds.items()
+                    if "uss" in value and tier == governor.FULL
+                ),
+            )
+            if thresholds
+            else {}
+        )
+        outcomes = probes.gather(pending, started)
+        for key, value in data.items():
+            if result := extract_proc_info(
+                func_name=key, proc_info=value, snapshots=snapshots
+            ):
+                if tree := trees.get(key):
+                    result = classify_tree(key, result, tree, thresholds[key])
+                if key in outcomes:
+                    result = classify_probes(key, result, outcomes[key])
+                results[key] = result
+        if env.check_performance:
+            baseline.dump_state()
+    if env.metrics_port:
+        exporter.record(
+            {key: COLORS[result.color] for key, result in results.items()},
+            data,
+            snapshots,
+            outcomes,
+        )
+    if env.store_metrics:
+        with span("store"):
+            store_metrics(data, snapshots, results)
+    return results
+
+
+def merge_agents(results: Dict[str, Result]) -> Dict[str, Result]:
+    """Merges the results of this host with the latest results received from the agents.
+
+    Args:
+        results: Result of each function on this host.
+
+    Returns:
+        Dict[str, Result]:
+        Returns the merged result of each function.
+
+    Notes:
+        - Functions of an agent that hasn't reported within the agent expiry are marked red.
+        - A function that is reported by more than one host, takes the worst of the results.
+    """
+    merged = dict(results)
+    now = time.time()
+    for host, (received, agent_results) in collector.get_agents().items():
+        expired = now - received > env.agent_expiry
+        if expired:
+            LOGGER.critical("Agent '%s' hasn't reported for %ds", host, now - received)
+        for func_name, (color, impact, _) in agent_results.items():
+            if expired:
+                result = Result(
+                    color_codes.red, ("AGENT UNREACHABLE\n", host), notify=True
+                )
+            else:
+                # Notify flag is derived from the color as it is for this host, instead of trusting the agent
+                result = Result(
+                    getattr(color_codes, color), tuple(impact), notify=color == "red"
+                )
+            if (existing := merged.get(func_name)) and SEVERITY.get(
+                COLORS[existing.color], 0
+            ) >= SEVERITY.get(COLORS[result.color], 0):
+                continue
+            merged[func_name] = result
+    return merged
+
+
+def main() -> Tuple[dict, bool]:
+    """Checks the health of all processes in the mapping and actions accordingly.
+
+    Returns:
+        Tuple[dict, bool]:
+        Returns the status that was published, and a boolean flag to indicate if a notification has to be sent.
+    """
     if datetime.now().minute in env.override_check:
         env.check_existing = False
     LOGGER.info("Monitoring processes health at: %s", static.DATETIME)
-    if not (data := get_data()):
-        publish_docs()
-        return
-    notify = False
-    futures = {}
-    with ThreadPoolExecutor(max_workers=len(data)) as executor:
-        for key, value in data.items():
-            future = executor.submit(
-                extract_proc_info, **dict(func_name=key, proc_info=value)
-            )
-            futures[future] = key
-    for future in as_completed(futures):
-        if future.exception():
-            LOGGER.error(
-                "Thread processing for '%s' received an exception: %s",
-                futures[future],
-                future.exception(),
-            )
-            notify = True
-    data_keys = sorted(data.keys())
-    stat_keys = sorted(STATUS_DICT.keys())
-    if data_keys != stat_keys:
-        missing_key = set(data_keys).difference(stat_keys)
-        for key in missing_key:
-            for pid, impact in data[key].items():
-                STATUS_DICT[key] = [color_codes.red, ["INVALID PROCESS ID\n"] + impact]
-                notify = True
+    results = evaluate()
+    if env.collector_port:
+        results = merge_agents(results or {})
+    if not results:
+        with span("render"):
+            return publish_docs(), False
+    notify = any(result.notify for result in results.values())
     translate = {
-        string.capwords(str(k).replace("_", " ")).replace("Api", "API"): STATUS_DICT[k]
-        for k in sorted(STATUS_DICT, key=len)
+        string.capwords(str(k).replace("_", " ")).replace("Api", "API"): [
+            results[k].color,
+            list(results[k].impact),
+        ]
+        for k in sorted(results, key=len)
     }
-    if notify:
-        Thread(target=send_email, kwargs={"status": translate}).start()
-    elif os.path.isfile(static.NOTIFICATION):
-        os.remove(static.NOTIFICATION)
-    publish_docs(status=translate)
+    with span("uptime"):
+        uptime_summary = uptime.update(translate) if env.track_uptime else None
+    with span("render"):
+        return publish_docs(status=translate, uptime_summary=uptime_summary), notify
@@ -0,0 +1,24 @@
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+WORKSPACE = tempfile.mkdtemp(prefix="jarvis_tests_")
+# Registered first, so it runs after the log listener is stopped at exit
+atexit.register(shutil.rmtree, WORKSPACE, ignore_errors=True)
+
+# Environment variables have to be set before the constants are loaded
+os.environ.update(
+    source_map=os.path.join(WORKSPACE, "processes.yaml"),
+    git_user="tests",
+    git_token="tests",
+    git_owner="tests",
+    log="stdout",
+)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.constants import static  # noqa: E402
+
+# Before the tests import the monitored modules
+static.isolate(WORKSPACE)
@@ -0,0 +1,61 @@
+import os
+
+import pytest
+
+from models import baseline
+from models.constants import env, static
+from models.helper import check_performance
+from models.snapshot import Snapshot
+
+
+@pytest.fixture(autouse=True)
+def state(tmp_path, monkeypatch):
+    """Starts each test with empty baselines, dumped into a temporary directory."""
+    monkeypatch.setattr(baseline, "BASELINES", {})
+    monkeypatch.setattr(static, "BASELINE_STATE", str(tmp_path / "baselines.json"))
+    monkeypatch.setattr(env, "baseline_warmup", 5)
+    monkeypatch.setattr(env, "baseline_deviation", 3.0)
+
+
+def snapshot(pid: int, threads: int) -> Snapshot:
+    """Creates a snapshot of a running process with the number of threads."""
+    return Snapshot(
+        pid=pid, status="running", threads=threads, fds=10, rss=0, cpu_time=0.0
+    )
+
+
+def test_warmup_uses_fixed_limits():
+    """Fixed limits are used until the baseline has warmed up, and metrics without a limit are not flagged."""
+    assert baseline.observe("api[0]", {"cpu": 80.0, "threads": 500}) == {"cpu": 80.0}
+    assert baseline.observe("api[0]", {"cpu": 10.0, "threads": 500}) == {}
+
+
+def test_deviation_above_baseline():
+    """Only the values above the mean by more than the spread are flagged, once the baseline has warmed up."""
+    for _ in range(env.baseline_warmup):
+        assert baseline.observe("api[0]", {"threads": 10}) == {}
+    # Spread is the floor, since the baseline is flat
+    assert baseline.observe("api[0]", {"threads": 12}) == {}
+    assert baseline.observe("api[0]", {"threads": 13}) == {"threads": 13}
+    assert baseline.observe("api[0]", {"threads": 1}) == {}
+    assert baseline.BASELINES["api[0]"]["threads"][0] == env.baseline_warmup + 3
+
+
+def test_baseline_per_process():
+    """Processes of the same function are compared against their own baseline, not a shared one."""
+    for _ in range(env.baseline_warmup):
+        assert check_performance("api", snapshot(100, 40), position=0) is None
+        assert check_performance("api", snapshot(101, 4), position=1) is None
+    assert check_performance("api", snapshot(100, 60), position=0) == {"threads": 60}
+    assert check_performance("api", snapshot(101, 8), position=1) == {"threads": 8}
+    # Position identifies the process across restarts, regardless of the PID
+    assert check_performance("api", snapshot(200, 40), position=0) is None
+
+
+def test_dump_and_load_state():
+    """Baselines are restored from the state file when the monitor starts again."""
+    baseline.observe("api[0]", {"threads": 10})
+    baseline.dump_state()
+    assert os.path.isfile(static.BASELINE_STATE)
+    baseline.BASELINES.clear()
+    assert baseline.load_state() == {"api[0]": {"threads": [1, 10.0, 0.0]}}
@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from models import breaker
+from models.constants import env, static
+
+START = 1_700_000_000.0
+
+
+@pytest.fixture
+def clock(tmp_path, monkeypatch):
+    """Starts each test with a closed circuit in a temporary directory, and controls the time of each call."""
+    monkeypatch.setattr(static, "BREAKER_STATE", str(tmp_path / "breaker.json"))
+    monkeypatch.setattr(env, "breaker_threshold", 3)
+    now = SimpleNamespace(value=START)
+    monkeypatch.setattr(breaker, "time", SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+def response(status_code: int, headers: dict = None) -> requests.Response:
+    """Creates a response object with the status code and headers."""
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    return response
+
+
+@pytest.mark.parametrize(
+    "status_code, headers, outage",
+    [
+        (500, {}, True),
+        (503, {}, True),
+        (429, {}, True),
+        (403, {"X-RateLimit-Remaining": "0"}, True),
+        (403, {"Retry-After": "60"}, True),
+        (403, {"X-RateLimit-Remaining": "10"}, False),
+        (404, {}, False),
+        (422, {}, False),
+        (200, {}, False),
+    ],
+)
+def test_is_outage(status_code, headers, outage):
+    """Server errors and rate limits are outages, and the other errors are left to the caller."""
+    assert breaker.is_outage(response(status_code, headers)) is outage
+
+
+def test_opens_at_threshold(clock):
+    """Circuit stays closed below the threshold, and opens for the backoff once it is reached."""
+    for _ in range(env.breaker_threshold - 1):
+        breaker.failure("error")
+        assert breaker.allow()
+    breaker.failure("error")
+    assert not breaker.allow()
+    clock.value += breaker.BACKOFF
+    assert breaker.allow()
+
+
+def test_backoff_doubles_up_to_maximum(clock):
+    """Each failure after the threshold doubles the backoff, up to the maximum."""
+    for _ in range(env.breaker_threshold - 1):
+        breaker.failure("error")
+    backoffs = []
+    for _ in range(8):
+        breaker.failure("error")
+        backoffs.append(breaker.load_state()["opened_until"] - clock.value)
+    assert backoffs == [60, 120, 240, 480, 960, 1920, 3600, 3600]
+
+
+def test_success_closes(clock):
+    """Success resets the failures and closes the circuit, so the count starts over."""
+    for _ in range(env.breaker_threshold):
+        breaker.failure("error")
+    breaker.success()
+    assert breaker.allow()
+    assert breaker.load_state() == {"failures": 0, "opened_until": 0}
+    breaker.failure("error")
+    assert breaker.allow()
@@ -0,0 +1,30 @@
+import pytest
+
+import monitor
+from models import collector
+from models.constants import color_codes
+
+
+@pytest.mark.parametrize(
+    "result, valid",
+    [
+        (["red", ["Impact"], True], True),
+        (["red", [], True], False),
+        (["red", [1], True], False),
+        (["purple", ["Impact"], True], False),
+        (["red", ["Impact"], "true"], False),
+    ],
+)
+def test_is_valid(result, valid):
+    """Snapshots are accepted only when each result has a known color, non-empty text impact and a notify flag."""
+    assert collector.is_valid({"host": "agent", "results": {"api": result}}) is valid
+
+
+def test_publish_docs_without_impact():
+    """Status page is published, even when a degraded function has no impact."""
+    status = {
+        "jarvis": [color_codes.green, ["Main process"]],
+        "api": [color_codes.red, []],
+        "speech": [color_codes.green, ["Speech"]],
+    }
+    assert monitor.publish_docs(status) == status
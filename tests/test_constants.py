@@ -0,0 +1,31 @@
+import os
+from datetime import datetime, timedelta
+
+from models import constants
+
+
+def test_cleanup_dated_logs(tmp_path, monkeypatch):
+    """Dated log files beyond the retention are deleted, leaving the rotated log files and other files as is."""
+    monkeypatch.setattr(constants.env, "log_retention", 3)
+    today = datetime.now()
+    dated = {
+        days: (today - timedelta(days=days)).strftime("jarvis_%d-%m-%Y.log")
+        for days in range(6)
+    }
+    others = ["jarvis.log", "jarvis.log.2020-01-01", "notes.txt"]
+    for file in [*dated.values(), *others]:
+        (tmp_path / file).touch()
+    constants.cleanup_dated_logs(str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        [*(dated[days] for days in range(4)), *others]
+    )
+
+
+def test_get_handler_cleans_up_once(tmp_path, monkeypatch):
+    """Dated log files are cleaned up when the log file is created, and not on each run after that."""
+    monkeypatch.setattr(constants.env, "log", constants.LogOptions.file)
+    directories = []
+    monkeypatch.setattr(constants, "cleanup_dated_logs", directories.append)
+    for _ in range(2):
+        constants.get_handler(str(tmp_path)).close()
+    assert directories == [str(tmp_path)]
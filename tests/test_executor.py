@@ -0,0 +1,54 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import wait
+
+import pytest
+
+from models.executor import DaemonExecutor
+
+
+def test_submit_result_and_exception():
+    """Results and exceptions of the calls are set on their futures."""
+    executor = DaemonExecutor(max_workers=2, thread_name_prefix="test")
+    assert executor.submit(sum, [1, 2, 3]).result(timeout=5) == 6
+    with pytest.raises(ZeroDivisionError):
+        executor.submit(divmod, 1, 0).result(timeout=5)
+
+
+def test_max_workers():
+    """Only the number of workers run at once, the rest wait for a slot."""
+    executor = DaemonExecutor(max_workers=2, thread_name_prefix="test")
+    release = threading.Event()
+    running = []
+
+    def block(index: int) -> None:
+        """Blocks until released."""
+        running.append(index)
+        release.wait(timeout=5)
+
+    futures = [executor.submit(block, index) for index in range(3)]
+    time.sleep(0.2)
+    assert len(running) == 2
+    release.set()
+    wait(futures, timeout=5)
+    assert sorted(running) == [0, 1, 2]
+
+
+def test_exit_without_waiting():
+    """Process exits without waiting for a call that is still running."""
+    code = (
+        "import time;"
+        "from models.executor import DaemonExecutor;"
+        "DaemonExecutor(max_workers=1, thread_name_prefix='test').submit(time.sleep, 30)"
+    )
+    start = time.time()
+    subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        check=True,
+        timeout=20,
+    )
+    assert time.time() - start < 10
@@ -0,0 +1,33 @@
+import json
+import os
+
+import pytest
+
+import monitor
+
+
+@pytest.mark.parametrize("options", [["cpu"], 90, "cpu"])
+def test_parse_thresholds_not_a_mapping(options):
+    """Thresholds that are not a mapping are skipped, along with the processes still being parsed."""
+    data, thresholds, _ = monitor.parse(
+        {"jarvis": {100: ["Main process"], monitor.THRESHOLDS: options}}
+    )
+    assert data == {"jarvis": {100: ["Main process"]}}
+    assert thresholds == {}
+
+
+def test_dump_status():
+    """Status is replaced atomically, without leaving the temporary file behind."""
+    monitor.dump_status({"version": monitor.STATUS_VERSION})
+    with open(monitor.static.STATUS_JSON) as file:
+        assert json.load(file) == {"version": monitor.STATUS_VERSION}
+    assert not os.path.exists(f"{monitor.static.STATUS_JSON}.tmp")
+
+
+def test_sidecar():
+    """Sidecar is loaded only for the key of the source file it was dumped with."""
+    data = {"jarvis": {100: ["Main process"]}}
+    monitor.dump_sidecar((1, 2, 3), data)
+    assert monitor.load_sidecar((1, 2, 3)) == data
+    assert monitor.load_sidecar((1, 2, 4)) is None
+    assert not os.path.exists(f"{monitor.static.SOURCE_CACHE}.tmp")
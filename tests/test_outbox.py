@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+
+import pytest
+
+from models import outbox
+from models.constants import static
+
+START = 1_700_000_000.0
+ALERT = ("api", "red")
+
+
+@pytest.fixture
+def clock(tmp_path, monkeypatch):
+    """Starts each test with an empty outbox in a temporary directory, and controls the time of each call."""
+    monkeypatch.setattr(static, "OUTBOX", str(tmp_path / "outbox.db"))
+    monkeypatch.setattr(outbox, "CONNECTION", {})
+    now = SimpleNamespace(value=START)
+    monkeypatch.setattr(outbox, "time", SimpleNamespace(time=lambda: now.value))
+    yield now
+    outbox.connect().close()
+
+
+def test_alert_notified_once(clock):
+    """Alert that stays active is notified once, and again only after the throttle."""
+    outbox.record({ALERT: ["Impact"]})
+    assert outbox.get_due(0) == [ALERT]
+    outbox.enqueue([ALERT], "subject", "body")
+    clock.value += 60
+    outbox.record({ALERT: ["Impact"]})
+    assert outbox.get_due(0) == []
+    row = outbox.connect().execute("SELECT occurrences FROM alerts").fetchone()
+    assert row == (2,)
+    clock.value += outbox.THROTTLE
+    outbox.record({ALERT: ["Impact"]})
+    assert outbox.get_due(0) == [ALERT]
+
+
+def test_resolved_alert_notified_again(clock):
+    """Alert that is no longer active is resolved, and notified again when it recurs."""
+    outbox.record({ALERT: ["Impact"]})
+    outbox.enqueue(outbox.get_due(0), "subject", "body")
+    clock.value += 60
+    outbox.record({})
+    assert outbox.connect().execute("SELECT * FROM alerts").fetchall() == []
+    clock.value += 60
+    outbox.record({ALERT: ["Impact"]})
+    assert outbox.get_due(0) == [ALERT]
+
+
+def test_digest_window(clock):
+    """Alerts are due only once the oldest of them has waited for the window, and are then due together."""
+    outbox.record({ALERT: ["Impact"]})
+    clock.value += 60
+    outbox.record({ALERT: ["Impact"], ("speech", "red"): ["Impact"]})
+    assert outbox.get_due(300) == []
+    clock.value += 240
+    assert sorted(outbox.get_due(300)) == [ALERT, ("speech", "red")]
+
+
+def test_delivery_backoff(clock):
+    """Failed delivery is retried after a backoff that doubles, and is given up after the maximum attempts."""
+    outbox.enqueue([], "subject", "body")
+    for attempt in range(1, outbox.MAX_ATTEMPTS + 1):
+        ((delivery_id, _, _, attempts),) = outbox.get_deliveries()
+        assert attempts == attempt - 1
+        outbox.mark_failed(delivery_id, attempt, "error")
+        backoff = min(60 * 2 ** (attempt - 1), 3_600)
+        clock.value += backoff - 1
+        assert outbox.get_deliveries() == []
+        clock.value += 1
+    assert outbox.get_deliveries() == []
+
+
+def test_delivery_sent_and_retained(clock):
+    """Sent delivery is not attempted again, and is deleted once it is beyond the retention."""
+    outbox.enqueue([], "subject", "body")
+    ((delivery_id, *_),) = outbox.get_deliveries()
+    outbox.mark_sent(delivery_id)
+    assert outbox.get_deliveries() == []
+    clock.value += outbox.RETENTION + 1
+    outbox.enqueue([], "subject", "body")
+    ((next_id, *_),) = outbox.get_deliveries()
+    outbox.mark_sent(next_id)
+    rows = outbox.connect().execute("SELECT id FROM deliveries").fetchall()
+    assert rows == [(next_id,)]
@@ -0,0 +1,72 @@
+import cProfile
+import logging
+import logging.handlers
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from models import profiler
+from models.constants import env, static
+
+
+class ExclusiveProfile(cProfile.Profile):
+    """Profiler that allows only one to be active at a time, as in Python 3.12+."""
+
+    active = threading.Lock()
+
+    def enable(self, *args, **kwargs):
+        """Enables the profiler, only if no other profiler is active."""
+        if not self.active.acquire(blocking=False):
+            raise ValueError("Another profiling tool is already active")
+        self.enabled = True
+        super().enable(*args, **kwargs)
+
+    def disable(self):
+        """Disables the profiler, and releases it for the others."""
+        super().disable()
+        # Disabled once more when the stats are created
+        if getattr(self, "enabled", False):
+            self.enabled = False
+            self.active.release()
+
+
+@pytest.fixture
+def profiling(monkeypatch, tmp_path):
+    """Enables profiling for the test, with the profiles dumped into a temporary directory."""
+    monkeypatch.setattr(env, "profile", True)
+    monkeypatch.setattr(static, "PROFILE_DIRECTORY", str(tmp_path))
+    yield
+    profiler.PROFILES.clear()
+
+
+def run_profiled() -> int:
+    """Runs a call in a worker thread within a profiled run, as the check does."""
+    with profiler.profile(), ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(profiler.traced, sum, [1, 2, 3]).result()
+
+
+def test_traced_with_profiling(profiling):
+    """Calls in worker threads are profiled and merged into the dump of the run."""
+    assert run_profiled() == 6
+    assert len(os.listdir(static.PROFILE_DIRECTORY)) == 1
+    assert not profiler.PROFILES
+
+
+def test_traced_with_an_active_profiler(profiling, monkeypatch):
+    """Calls in worker threads still run, when another profiler is already active."""
+    monkeypatch.setattr(profiler.cProfile, "Profile", ExclusiveProfile)
+    assert run_profiled() == 6
+    assert len(os.listdir(static.PROFILE_DIRECTORY)) == 1
+
+
+def test_summary_through_queue():
+    """Summary record is handed over to a queue, so the run never writes to the file itself."""
+    handlers = [type(handler) for handler in profiler.SUMMARY.handlers]
+    assert logging.handlers.QueueHandler in handlers
+    assert logging.handlers.RotatingFileHandler not in handlers
+    with profiler.instrument() as record:
+        pass
+    assert record["failed"] is False
+    assert "total" in record["phases"]
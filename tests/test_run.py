@@ -0,0 +1,161 @@
+import json
+import os
+
+import pytest
+import requests
+
+import run
+from models import breaker, governor
+from models.constants import color_codes, env, static
+from models.helper import digest
+
+GREEN = {"jarvis": [color_codes.green, ["Main process"]]}
+YELLOW = {"jarvis": [color_codes.yellow, ["Main process"]]}
+
+
+def response(
+    status_code: int, body: dict = None, headers: dict = None
+) -> requests.Response:
+    """Creates a response object with the status code, JSON body and headers."""
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps(body).encode() if body is not None else b""
+    response.headers.update(headers or {})
+    return response
+
+
+class FakeGitHub(run.GitHub):
+    """GitHub object that records the pushes, and responds with the queued status codes instead of calling GitHub.
+
+    >>> FakeGitHub
+
+    """
+
+    def __init__(self):
+        """Instantiates the pushes that were made, and the status codes for the next ones."""
+        super().__init__()
+        self.pushes = []
+        self.responses = []
+        self.syncs = 0
+
+    def sync(self):
+        """Returns the head of docs branch, without any requests."""
+        self.syncs += 1
+        return {"commit": f"commit_{self.syncs}", "tree": "tree", "etag": None}
+
+    def get_head(self, etag: str = None) -> requests.Response:
+        """Responds as if the branch hasn't moved."""
+        return response(304)
+
+    def git_push(self, files, head):
+        """Records the push, and responds with the next status code."""
+        self.pushes.append(dict(files))
+        status_code = self.responses.pop(0) if self.responses else 200
+        body = {"object": {"sha": f"pushed_{len(self.pushes)}"}}
+        return response(status_code, body if status_code == 200 else {}), "tree"
+
+
+@pytest.fixture
+def github(tmp_path, monkeypatch):
+    """Points the state files to a temporary directory, and creates a fake GitHub object."""
+    for name, filename in (
+        ("DOCS_STATE", "docs.json"),
+        ("SPOOL", "spool.json"),
+        ("BREAKER_STATE", "breaker.json"),
+        ("HISTORY_FILE", "history.jsonl"),
+        ("UPTIME_FILE", "uptime_summary.json"),
+        ("GOVERNOR_STATE", "governor.json"),
+        ("INDEX_FILE", "index.html"),
+    ):
+        monkeypatch.setattr(static, name, str(tmp_path / filename))
+    monkeypatch.setattr(governor, "STATE", {})
+    monkeypatch.setattr(env, "check_existing", True)
+    monkeypatch.setattr(env, "client_render", False)
+    monkeypatch.setattr(env, "publish_interval", 0)
+    monkeypatch.setattr(env, "breaker_threshold", 3)
+    return FakeGitHub()
+
+
+def publish(github: FakeGitHub, status: dict) -> None:
+    """Writes the index file for the status, and pushes it as the monitor does after each check."""
+    with open(static.INDEX_FILE, "w") as file:
+        file.write(json.dumps(status))
+    github.push_to_github(status)
+
+
+def test_push_delivers_and_clears_spool(github):
+    """Changed status is delivered in a single push, and the spool is removed once it is delivered."""
+    publish(github, GREEN)
+    assert len(github.pushes) == 1
+    assert github.pushes[0][static.INDEX_PATH] == json.dumps(GREEN)
+    assert static.HISTORY_PATH in github.pushes[0]
+    assert not os.path.exists(static.SPOOL)
+    assert not os.path.exists(static.INDEX_FILE)
+    state = run.load_state()
+    assert state["digest"] == digest(GREEN)
+    assert state["commit"] == "pushed_1"
+
+
+def test_unchanged_status_not_pushed(github):
+    """Status that was already delivered is not pushed again, when the branch hasn't moved."""
+    publish(github, GREEN)
+    publish(github, GREEN)
+    assert len(github.pushes) == 1
+
+
+def test_history_pushed_only_on_change(github):
+    """Files that are pushed only on change are left out, when they are the same as the last push."""
+    publish(github, GREEN)
+    history = github.pushes[0][static.HISTORY_PATH]
+    publish(github, YELLOW)
+    assert github.pushes[1][static.HISTORY_PATH] != history
+    state = run.load_state()
+    run.dump_state(**{**state, "digest": None})
+    publish(github, YELLOW)
+    assert static.HISTORY_PATH not in github.pushes[2]
+
+
+def test_outage_keeps_spool_and_opens_circuit(github):
+    """Spool is kept while GitHub is down, and no pushes are attempted while the circuit is open."""
+    github.responses = [503] * env.breaker_threshold
+    for _ in range(env.breaker_threshold):
+        publish(github, GREEN)
+    assert len(github.pushes) == env.breaker_threshold
+    assert run.load_spool()["digest"] == digest(GREEN)
+    assert not breaker.allow()
+    publish(github, GREEN)
+    assert len(github.pushes) == env.breaker_threshold
+    assert run.load_spool()["digest"] == digest(GREEN)
+
+
+def test_spool_replaced_by_latest_status(github):
+    """Pending push is replaced by the latest status, instead of delivering a stale one."""
+    github.responses = [503]
+    publish(github, GREEN)
+    assert run.load_spool()["digest"] == digest(GREEN)
+    publish(github, YELLOW)
+    assert github.pushes[-1][static.INDEX_PATH] == json.dumps(YELLOW)
+    assert not os.path.exists(static.SPOOL)
+    assert run.load_state()["digest"] == digest(YELLOW)
+
+
+def test_stale_spool_dropped(github):
+    """Pending push is dropped, when the status goes back to the one that was delivered last."""
+    publish(github, GREEN)
+    github.responses = [503]
+    publish(github, YELLOW)
+    assert run.load_spool()["digest"] == digest(YELLOW)
+    publish(github, GREEN)
+    assert not os.path.exists(static.SPOOL)
+    assert len(github.pushes) == 2
+    assert run.load_state()["digest"] == digest(GREEN)
+
+
+def test_push_retried_after_sync(github):
+    """Push that is rejected for a moved branch is retried once, after a sync with the remote."""
+    github.responses = [422, 200]
+    publish(github, GREEN)
+    assert len(github.pushes) == 2
+    assert github.syncs == 2
+    assert not os.path.exists(static.SPOOL)
+    assert run.load_state()["commit"] == "pushed_2"
@@ -0,0 +1,50 @@
+import os
+
+import jinja2
+import pytest
+
+from models import templates
+
+
+@pytest.fixture
+def directory(tmp_path, monkeypatch):
+    """Points the environment to a directory with a template that extends another."""
+    (tmp_path / "base.html").write_text("{% block body %}{% endblock %}!")
+    (tmp_path / "child.html").write_text(
+        '{% extends "base.html" %}{% block body %}{{ value }}{% endblock %}'
+    )
+    monkeypatch.setattr(
+        templates.ENVIRONMENT, "loader", jinja2.FileSystemLoader(str(tmp_path))
+    )
+    monkeypatch.setattr(templates, "RENDERED", {})
+    return tmp_path
+
+
+def test_render_records_parents(directory):
+    """Templates that are extended are recorded along with the template that was rendered."""
+    assert templates.render("child.html", value=1) == "1!"
+    _, (compiled, *parents), _ = templates.RENDERED["child.html"]
+    assert compiled is templates.ENVIRONMENT.get_template("child.html")
+    assert parents == [templates.ENVIRONMENT.get_template("base.html")]
+
+
+def test_render_without_parsing(directory, monkeypatch):
+    """Source is not loaded again when only the input changes."""
+    templates.render("child.html", value=1)
+
+    def get_source(*args):
+        """Fails the test when the source is loaded."""
+        raise AssertionError("Source was loaded")
+
+    monkeypatch.setattr(templates.ENVIRONMENT.loader, "get_source", get_source)
+    assert templates.render("child.html", value=2) == "2!"
+
+
+def test_render_memoized_until_parent_changes(directory):
+    """Rendered content is re-used until a template that is extended is modified."""
+    content = templates.render("child.html", value=1)
+    assert templates.render("child.html", value=1) is content
+    (directory / "base.html").write_text("{% block body %}{% endblock %}?")
+    mtime = os.path.getmtime(directory / "base.html") + 10
+    os.utime(directory / "base.html", (mtime, mtime))
+    assert templates.render("child.html", value=1) == "1?"
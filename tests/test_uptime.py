@@ -0,0 +1,94 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from models import uptime
+from models.constants import color_codes, static
+
+START = 1_700_000_000 // 3_600 * 3_600
+
+
+@pytest.fixture
+def clock(tmp_path, monkeypatch):
+    """Points the state files to a temporary directory, and controls the time of each update."""
+    monkeypatch.setattr(static, "UPTIME_STATE", str(tmp_path / "uptime.json"))
+    monkeypatch.setattr(static, "UPTIME_FILE", str(tmp_path / "uptime_summary.json"))
+    now = SimpleNamespace(value=START)
+    monkeypatch.setattr(uptime, "time", SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+def check(name: str, color: str) -> dict:
+    """Updates the counters with the color of a single process, and returns its summary."""
+    return uptime.update({name: [color, ["Impact"]]})[name]
+
+
+def test_uptime_percentage(clock):
+    """Uptime is the share of checks that were not red, and maintenance is not counted."""
+    for color in (color_codes.green, color_codes.yellow, color_codes.red):
+        summary = check("api", color)
+    assert summary["24h"]["uptime"] == 66.67
+    assert uptime.update({"api": [color_codes.blue, ["Maintenance"]]}) == {}
+    assert uptime.load_state()["api"]["sums"]["24h"] == [2, 3]
+    with open(static.UPTIME_FILE) as file:
+        assert json.load(file)["processes"] == {}
+
+
+def test_incident_open_and_close(clock):
+    """Incident is opened when a process turns red, and closed when it recovers."""
+    check("api", color_codes.green)
+    clock.value += 60
+    summary = check("api", color_codes.red)
+    assert summary["24h"]["incidents"] == 1
+    assert summary["24h"]["mttr"] is None
+    clock.value += 60
+    # Incident that is still ongoing is not opened again
+    assert check("api", color_codes.red)["24h"]["incidents"] == 1
+    clock.value += 120
+    summary = check("api", color_codes.green)
+    assert summary["24h"]["incidents"] == 1
+    assert summary["24h"]["mttr"] == 180
+    assert uptime.load_state()["api"]["incidents"] == [[START + 60, START + 240]]
+
+
+def test_eviction_from_window(clock):
+    """Buckets are evicted from a window once they are older than it, and kept in the longer windows."""
+    check("api", color_codes.red)
+    clock.value += 23 * 3_600
+    assert check("api", color_codes.green)["24h"]["uptime"] == 50.0
+    clock.value += 3_600
+    summary = check("api", color_codes.green)
+    assert summary["24h"]["uptime"] == 100.0
+    assert summary["7d"]["uptime"] == 66.67
+    assert summary["30d"]["uptime"] == 66.67
+
+
+def test_gap_longer_than_window(clock):
+    """Windows are reset when the monitor was down for longer than them, without walking each missed hour."""
+    check("api", color_codes.red)
+    clock.value += 200 * 3_600
+    summary = check("api", color_codes.green)
+    assert summary["24h"]["uptime"] == 100.0
+    assert summary["7d"]["uptime"] == 100.0
+    assert summary["30d"]["uptime"] == 50.0
+    counter = uptime.load_state()["api"]
+    assert counter["cursors"]["24h"] == START // 3_600 + 200 - 23
+    assert counter["sums"]["7d"] == [1, 1]
+
+
+def test_retention(clock):
+    """Buckets and recovered incidents beyond the longest window are dropped, and ongoing incidents are kept."""
+    check("api", color_codes.red)
+    check("api", color_codes.green)
+    check("speech", color_codes.red)
+    clock.value += uptime.RETENTION * 3_600
+    assert check("api", color_codes.green)["30d"] == {
+        "uptime": 100.0,
+        "incidents": 0,
+        "mttr": None,
+    }
+    assert check("speech", color_codes.red)["30d"]["incidents"] == 1
+    state = uptime.load_state()
+    assert list(state["api"]["buckets"]) == [str(START // 3_600 + uptime.RETENTION)]
+    assert state["speech"]["incidents"] == [[START, None]]
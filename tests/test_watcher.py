@@ -0,0 +1,54 @@
+import os
+import subprocess
+import threading
+import time
+
+import pytest
+
+from models import watcher
+from models.constants import env
+
+
+@pytest.fixture
+def source_map():
+    """Writes an empty source map, and removes it at the end."""
+    with open(env.source_map, "w") as file:
+        file.write("{}\n")
+    yield env.source_map
+    os.remove(env.source_map)
+
+
+def rewrite(filepath, delay: float) -> None:
+    """Re-writes the source map after a delay."""
+    time.sleep(delay)
+    with open(filepath, "w") as file:
+        file.write("jarvis: {}\n")
+
+
+def test_source_map_change_without_pidfd(source_map):
+    """Source map changes are detected through inotify, when the processes are waited on as a fallback."""
+    instance = watcher.Watcher()
+    if instance.inotify_fd is None:
+        pytest.skip("inotify is unavailable")
+    instance.pidfd = False
+    child = subprocess.Popen(["sleep", "30"])
+    try:
+        instance.watch([child.pid])
+        assert child.pid in instance.processes
+        threading.Thread(target=rewrite, args=(source_map, 1)).start()
+        start = time.time()
+        assert instance.wait(4, debounce=0)
+        assert time.time() - start < 3
+    finally:
+        child.kill()
+        child.wait()
+
+
+def test_process_exit_without_pidfd(source_map):
+    """Process exits are still detected, when the processes are waited on as a fallback."""
+    instance = watcher.Watcher()
+    instance.pidfd = False
+    child = subprocess.Popen(["sleep", "1"])
+    instance.watch([child.pid])
+    assert instance.wait(4, debounce=0)
+    assert child.pid in instance.exited